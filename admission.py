@@ -0,0 +1,216 @@
+"""
+Request admission for the Flask CRUD application
+
+Two checks that run before a request reaches the database:
+
+- Token buckets: each client gets a bucket per endpoint holding up to
+  ``burst`` tokens and refilling at ``rate`` tokens per second. A request
+  takes a token, or is refused with the seconds until the next one.
+- Concurrency slots: at most ``limit`` requests of a group run at once. A
+  request that finds every slot taken is refused at once instead of queueing
+  behind the others. A slot is leased: if its holder dies without giving it
+  back, it frees itself after ``lease`` seconds.
+
+Like the cache backends, "memory" keeps this state in the process, "sqlite"
+in a local SQLite file shared by every worker on the host, and "none" admits
+every request.
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+# How often idle buckets (full again, so the same as no bucket) and expired slots are swept, in seconds
+PRUNE_INTERVAL = 60
+
+
+def take_token(tokens, updated, now, rate, burst):
+    """
+    Refill a bucket last touched at ``updated`` and try to take a token.
+    Returns (tokens left, seconds until full, seconds to wait): a wait of 0 means the token was taken.
+    """
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        tokens -= 1
+        wait = 0.0
+    else:
+        wait = (1 - tokens) / rate
+    return tokens, (burst - tokens) / rate, wait
+
+
+class NullAdmission:
+    """Backend that admits every request (admission control disabled)"""
+
+    name = "none"
+
+    def take(self, key, rate, burst):
+        return 0.0
+
+    def acquire(self, group, limit, lease):
+        return "unlimited"
+
+    def release(self, slot):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryAdmission:
+    """Buckets and slots of this process only, so each worker enforces the limits on its own"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated, full_at)
+        self._slots = {}  # slot -> (group, expires_at)
+        self._slot_ids = itertools.count(1)
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens, refill_time, wait = take_token(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now, now + refill_time)
+            self._prune(now)
+        return wait
+
+    def acquire(self, group, limit, lease):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            held = sum(1 for slot_group, expires_at in self._slots.values() if slot_group == group and expires_at > now)
+            if held >= limit:
+                return None
+            slot = next(self._slot_ids)
+            self._slots[slot] = (group, now + lease)
+            return slot
+
+    def release(self, slot):
+        with self._lock:
+            self._slots.pop(slot, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._slots.clear()
+
+    def _prune(self, now):
+        """Drop full buckets and expired slots, at most once per PRUNE_INTERVAL (caller holds the lock)"""
+        if now - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        self._slots = {slot: held for slot, held in self._slots.items() if held[1] > now}
+
+
+class SQLiteAdmission:
+    """Buckets and slots in a local SQLite file, so the limits hold across every worker on the host"""
+
+    name = "sqlite"
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS rate_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            full_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS rate_buckets_full_at ON rate_buckets (full_at)",
+        """CREATE TABLE IF NOT EXISTS concurrency_slots (
+            slot TEXT PRIMARY KEY,
+            slot_group TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS concurrency_slots_group ON concurrency_slots (slot_group, expires_at)",
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._slot_ids = itertools.count(1)
+        self._pruned_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            # Losing the last few updates in a crash only refills some buckets early, so skip the fsyncs
+            connection.execute("PRAGMA synchronous = OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row or (burst, now)
+            tokens, refill_time, wait = take_token(tokens, updated, now, rate, burst)
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + refill_time),
+            )
+            self._prune(connection, now)
+            connection.execute("COMMIT")
+        return wait
+
+    def acquire(self, group, limit, lease):
+        now = time.time()
+        slot = f"{os.getpid()}:{threading.get_ident()}:{next(self._slot_ids)}"
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            held = connection.execute(
+                "SELECT COUNT(*) FROM concurrency_slots WHERE slot_group = ? AND expires_at > ?", (group, now)
+            ).fetchone()[0]
+            if held < limit:
+                connection.execute(
+                    "INSERT INTO concurrency_slots (slot, slot_group, expires_at) VALUES (?, ?, ?)",
+                    (slot, group, now + lease),
+                )
+            self._prune(connection, now)
+            connection.execute("COMMIT")
+        return slot if held < limit else None
+
+    def release(self, slot):
+        self._connect().execute("DELETE FROM concurrency_slots WHERE slot = ?", (slot,))
+
+    def clear(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM rate_buckets")
+            connection.execute("DELETE FROM concurrency_slots")
+            connection.execute("COMMIT")
+
+    def _prune(self, connection, now):
+        """Drop full buckets and expired slots, at most once per PRUNE_INTERVAL per process"""
+        if now - self._pruned_at < PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        connection.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+        connection.execute("DELETE FROM concurrency_slots WHERE expires_at <= ?", (now,))
+
+
+def create_admission(backend, path=None):
+    """Build the admission backend named by ``backend`` ("memory", "sqlite" or "none")"""
+    if backend == "memory":
+        return MemoryAdmission()
+    if backend == "sqlite":
+        return SQLiteAdmission(path)
+    if backend == "none":
+        return NullAdmission()
+    raise ValueError(f"Unknown admission backend: {backend}")
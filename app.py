@@ -1,23 +1,347 @@
 # FLASK CRUD WEB APPLICATION
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import (
+    Flask,
+    current_app,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    flash,
+    jsonify,
+    Response,
+    stream_with_context,
+    abort,
+    make_response,
+    session,
+    g,
+    has_app_context,
+    has_request_context,
+    before_render_template,
+    template_rendered,
+)
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from functools import wraps
+from itertools import count, islice
+import base64
+import click
+import codecs
+import csv
+import hashlib
+import io
+import json
+import math
 import os
+import re
+import sqlite3
+import time
 from dotenv import load_dotenv
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.exceptions import HTTPException
+from werkzeug.local import LocalProxy
+from werkzeug.routing import IntegerConverter
+from werkzeug.security import safe_join
 
-# Initialize Flask application
-app = Flask(__name__)
+from admission import create_admission
+from cache import create_cache
+from compression import choose_encoding, compress, compress_chunks, is_compressible
+from metrics import MetricsRegistry
 
 # Configuration
 # Load environment variables
 load_dotenv()
 
-app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///exam_app.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-# Initialize database
-db = SQLAlchemy(app)
+def build_engine_options(uri):
+    """Return SQLAlchemy engine options (pooling, timeouts) suited to the database URI"""
+    pool_size = int(os.getenv("SQLALCHEMY_POOL_SIZE", "5"))
+    max_overflow = int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", "10"))
+
+    if uri.startswith("sqlite"):
+        # In-memory databases live on a single connection, so there is no pool to size
+        if ":memory:" in uri or uri.rstrip("/") == "sqlite:":
+            return {}
+        return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+    # Server databases: recycle idle connections and drop dead ones before use
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": int(os.getenv("SQLALCHEMY_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+# Requests per second and burst for each client, per endpoint ("*" covers every endpoint not listed)
+DEFAULT_RATE_LIMITS = (
+    "*=20/60,index=10/30,search_users=5/20,suggest_users=20/60,api_list_users=10/30,api_changes=2/10,"
+    "export_csv=0.1/3,export_jsonl=0.1/3,import_users_endpoint=0.2/3,api_batch_update_users=1/5,"
+    "api_batch_delete_users=1/5"
+)
+
+
+def parse_rate_limits(spec):
+    """Parse "endpoint=rate/burst,..." into {endpoint: (rate, burst)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, _, limit = item.partition("=")
+        rate, _, burst = limit.partition("/")
+        limits[endpoint.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+def load_config(app):
+    """Read the app's settings from the environment"""
+    app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///exam_app.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # SQLite connection tuning, applied to every new connection:
+    # WAL lets readers run alongside the single writer, NORMAL sync is safe with WAL,
+    # busy_timeout makes writers wait for the lock instead of failing with "database is locked"
+    # (busy_timeout goes first so the journal_mode switch also waits for the lock)
+    app.config["SQLITE_PRAGMAS"] = {
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-64000")),  # negative = KiB, so ~64 MB
+    }
+
+    # Read replicas: comma-separated URIs that read-only routes are sent to (the primary takes all writes).
+    # "round_robin" rotates through them, "least_loaded" picks the one with the fewest connections in use.
+    # After a write, the client reads from the primary for REPLICA_STICKY_SECONDS so it sees its own changes.
+    app.config["SQLALCHEMY_REPLICA_URIS"] = [
+        uri.strip() for uri in os.getenv("SQLALCHEMY_REPLICA_URIS", "").split(",") if uri.strip()
+    ]
+    app.config["SQLALCHEMY_BINDS"] = {
+        f"replica_{index}": {"url": uri, **build_engine_options(uri)}
+        for index, uri in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"])
+    }
+    app.config["REPLICA_STRATEGY"] = os.getenv("REPLICA_STRATEGY", "round_robin")
+    app.config["REPLICA_STICKY_SECONDS"] = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+    # Pagination settings for user listings
+    app.config["USERS_PER_PAGE"] = int(os.getenv("USERS_PER_PAGE", "50"))
+    app.config["USERS_MAX_PER_PAGE"] = int(os.getenv("USERS_MAX_PER_PAGE", "500"))
+
+    # Maximum number of rows returned by /search
+    app.config["SEARCH_RESULT_LIMIT"] = int(os.getenv("SEARCH_RESULT_LIMIT", "100"))
+
+    # /search/suggest: completions returned by default and at most, and how long browsers may reuse them
+    app.config["SUGGEST_LIMIT"] = int(os.getenv("SUGGEST_LIMIT", "8"))
+    app.config["SUGGEST_MAX_LIMIT"] = int(os.getenv("SUGGEST_MAX_LIMIT", "20"))
+    app.config["SUGGEST_MAX_AGE"] = int(os.getenv("SUGGEST_MAX_AGE", "60"))
+
+    # Bulk import settings
+    app.config["IMPORT_CHUNK_SIZE"] = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    app.config["IMPORT_MAX_REPORTED_ERRORS"] = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+    # Rows fetched per round trip while streaming exports
+    app.config["EXPORT_BATCH_SIZE"] = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Batch update/delete: ids per UPDATE/DELETE statement, and how many per-user cached pages
+    # are dropped one by one before the whole page cache is cleared instead
+    app.config["BATCH_CHUNK_SIZE"] = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+    app.config["BATCH_MAX_INVALIDATED_PAGES"] = int(os.getenv("BATCH_MAX_INVALIDATED_PAGES", "1000"))
+
+    # /api/changes: entries per response by default and at most, the longest ?wait= long poll and how
+    # often it checks for new entries, and how many days of history compact_changes() keeps in full.
+    # A waiting poll holds its worker thread, so long polls only wait on threaded or async servers
+    # (wsgi.multithread; a sync worker answers at once) and at most CHANGES_MAX_WAITERS (4) at a time
+    # through the admission backend; later ones answer at once too (0 turns long polling off)
+    app.config["CHANGES_PER_PAGE"] = int(os.getenv("CHANGES_PER_PAGE", "500"))
+    app.config["CHANGES_MAX_PER_PAGE"] = int(os.getenv("CHANGES_MAX_PER_PAGE", "5000"))
+    app.config["CHANGES_MAX_WAIT"] = float(os.getenv("CHANGES_MAX_WAIT", "30"))
+    app.config["CHANGES_MAX_WAITERS"] = int(os.getenv("CHANGES_MAX_WAITERS", "4"))
+    app.config["CHANGES_POLL_INTERVAL"] = float(os.getenv("CHANGES_POLL_INTERVAL", "0.5"))
+    app.config["CHANGES_RETENTION_DAYS"] = int(os.getenv("CHANGES_RETENTION_DAYS", "7"))
+
+    # Response cache: "memory" (per worker), "sqlite" (shared by all workers on the host) or "none"
+    app.config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "memory")
+    app.config["CACHE_TTL"] = int(os.getenv("CACHE_TTL", "60"))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    app.config["CACHE_PATH"] = os.getenv("CACHE_PATH", os.path.join(app.instance_path, "cache.db"))
+
+    # Request admission, checked before a request reaches the database: a token bucket per client and
+    # endpoint (RATE_LIMITS, see DEFAULT_RATE_LIMITS) answers 429 once a client exceeds its rate, and at most
+    # DB_CONCURRENCY_LIMIT requests to @db_heavy endpoints run at once (pages served from the cache need no slot),
+    # later ones get 503 straight away (0 = no limit). Both answer with Retry-After. A slot held longer than DB_SLOT_LEASE seconds (its worker
+    # died) is freed. State is per worker ("memory"), shared by the workers on the host ("sqlite") or off ("none").
+    app.config["ADMISSION_BACKEND"] = os.getenv("ADMISSION_BACKEND", "memory")
+    app.config["ADMISSION_PATH"] = os.getenv("ADMISSION_PATH", os.path.join(app.instance_path, "admission.db"))
+    app.config["RATE_LIMITS"] = parse_rate_limits(os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS))
+    app.config["DB_CONCURRENCY_LIMIT"] = int(os.getenv("DB_CONCURRENCY_LIMIT", "8"))
+    app.config["DB_SLOT_LEASE"] = float(os.getenv("DB_SLOT_LEASE", "300"))
+    app.config["OVERLOAD_RETRY_AFTER"] = int(os.getenv("OVERLOAD_RETRY_AFTER", "1"))
+
+    # Response compression (gzip, or brotli when installed) for text bodies of at least COMPRESS_MIN_SIZE bytes;
+    # levels trade CPU for size (gzip 1-9, brotli 0-11). Turn it off when a proxy in front already compresses.
+    app.config["COMPRESS_RESPONSES"] = os.getenv("COMPRESS_RESPONSES", "1") == "1"
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    app.config["COMPRESS_LEVELS"] = {
+        "gzip": int(os.getenv("COMPRESS_GZIP_LEVEL", "6")),
+        "br": int(os.getenv("COMPRESS_BROTLI_QUALITY", "4")),
+    }
+
+    # Directory for compiled templates, shared by every worker and kept across restarts
+    # ("" = a per-user directory in the system temp dir, "none" = compile in memory only)
+    app.config["JINJA_BYTECODE_CACHE"] = os.getenv("JINJA_BYTECODE_CACHE", "")
+
+    # Seconds browsers may keep a static file requested by its fingerprinted URL (see static_fingerprint())
+    app.config["STATIC_MAX_AGE"] = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+    # Metrics: a directory shared by all gunicorn workers lets /metrics report totals for every worker
+    app.config["METRICS_DIR"] = os.getenv("METRICS_DIR")
+    app.config["METRICS_FLUSH_INTERVAL"] = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+    # Seconds /readyz waits for the database ping before reporting not ready
+    app.config["READINESS_TIMEOUT"] = float(os.getenv("READINESS_TIMEOUT", "2"))
+
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """
+    Session that sends reads on read-only routes to a replica.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, and
+    once a transaction has written, its later reads do too. Each transaction
+    sticks to the one replica it picked first, so it sees a single snapshot.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, "is_dml", False):
+                self.info["wrote"] = True
+            elif not self.info.get("wrote") and reads_use_replica():
+                if "replica" not in self.info:
+                    self.info["replica"] = replica_router.choose()
+                if self.info["replica"] is not None:
+                    return self.info["replica"]
+            # A session created with its own bind (e.g. a connection holding an outer test transaction) keeps it
+            bind = self.bind
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Extensions: created here, bound to an app by create_app()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Page cache and admission state of the current app, created per app by create_app() with the configured backends
+response_cache = LocalProxy(lambda: current_app.extensions["response_cache"])
+admission = LocalProxy(lambda: current_app.extensions["admission"])
+
+metrics = MetricsRegistry()
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Run the configured PRAGMA statements on a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            # PRAGMA arguments cannot be bound parameters, so only allow plain words and numbers
+            if not re.fullmatch(r"[A-Za-z_]+", name) or not re.fullmatch(r"-?\w+", str(value)):
+                raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def register_sqlite_pragmas(engine, pragmas):
+    """Apply ``pragmas`` to every connection the engine opens (SQLite only)"""
+    if engine.dialect.name != "sqlite":
+        return
+    db.event.listen(
+        engine, "connect", lambda dbapi_connection, connection_record: apply_sqlite_pragmas(dbapi_connection, pragmas)
+    )
+
+
+# Read Replicas
+
+
+class ReplicaRouter:
+    """Picks the replica engine for read-only requests"""
+
+    def __init__(self, strategy="round_robin"):
+        self._counter = count()
+        self.configure([], strategy)
+
+    def configure(self, engines, strategy=None):
+        if strategy is not None:
+            if strategy not in ("round_robin", "least_loaded"):
+                raise ValueError(f"Unknown replica strategy: {strategy}")
+            self.strategy = strategy
+        self.replicas = list(engines)
+
+    def choose(self):
+        """Return a replica engine, or None if there are none (reads then use the primary)"""
+        if not self.replicas:
+            return None
+        if self.strategy == "least_loaded":
+            return min(self.replicas, key=lambda engine: getattr(engine.pool, "checkedout", lambda: 0)())
+        return self.replicas[next(self._counter) % len(self.replicas)]
+
+
+replica_router = ReplicaRouter()
+
+
+# Endpoints whose queries may be served by a replica
+READ_ONLY_ENDPOINTS = set()
+
+
+def read_only(view):
+    """Register a view (placed under @route) as read-only, so its queries may use a replica"""
+    READ_ONLY_ENDPOINTS.add(view.__name__)
+    return view
+
+
+def pinned_to_primary():
+    """True if this client wrote recently and must read its own writes from the primary"""
+    return session.get("_primary_until", 0) > time.time()
+
+
+def reads_use_replica():
+    return has_request_context() and request.endpoint in READ_ONLY_ENDPOINTS and not pinned_to_primary()
+
+
+def end_routed_transaction(db_session):
+    """Pin a client that just committed a write to the primary, and forget the replica choice"""
+    wrote = db_session.info.pop("wrote", False)
+    db_session.info.pop("replica", None)
+    if wrote and replica_router.replicas and has_request_context():
+        session["_primary_until"] = time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+
+
+def reset_routed_transaction(db_session, previous_transaction):
+    """A rolled back write pins nobody"""
+    db_session.info.pop("wrote", None)
+    db_session.info.pop("replica", None)
+
+
+db.event.listen(RoutingSession, "after_commit", end_routed_transaction)
+db.event.listen(RoutingSession, "after_soft_rollback", reset_routed_transaction)
+
+
+def refresh_replicas():
+    """
+    Copy the primary SQLite database over every replica file.
+
+    Simulates replication locally (tests, benchmarks, scripts/simulate_replicas.py):
+    point SQLALCHEMY_REPLICA_URIS at a few files and refresh them now and then.
+    """
+    with db.engine.connect() as connection:
+        primary = connection.connection.dbapi_connection
+        for engine in replica_router.replicas:
+            # SQLite's online backup gives a consistent copy even while the primary is written
+            target = sqlite3.connect(engine.url.database)
+            try:
+                primary.backup(target)
+            finally:
+                target.close()
+
 
 # Template constants
 TEMPLATE_ADD = "add.html"
@@ -34,62 +358,1392 @@ class User(db.Model):
     age = db.Column(db.Integer, nullable=False)
     city = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Listing sorts walk (sort column, id) in order; lower() indexes serve
+    # case-insensitive lookups on the searchable columns
+    __table_args__ = (
+        db.Index("ix_user_created_at", created_at, id),
+        db.Index("ix_user_last_name", last_name, id),
+        db.Index("ix_user_first_name_lower", db.func.lower(first_name)),
+        db.Index("ix_user_last_name_lower", db.func.lower(last_name)),
+        db.Index("ix_user_city_lower", db.func.lower(city)),
+    )
 
     def __repr__(self):
         return f"<User {self.id}: {self.first_name} {self.last_name}>"
 
 
-# Routes
+# Trigger-Maintained Tables
+
+
+def sqlite_table_exists(connection, name):
+    """Return True if ``connection`` is SQLite and has a table called ``name``"""
+    return connection.dialect.name == "sqlite" and bool(
+        connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).first()
+    )
+
+
+# Registered MaintainedTables, in creation order
+MAINTAINED_TABLES = []
+
+
+class MaintainedTable:
+    """
+    SQLite side table that triggers on "user" keep in step with every write.
+
+    ``ddl`` creates ``name``, any ``also_drops`` tables and the triggers, and
+    ``rebuild`` (SQL strings or statements) recomputes the contents from the
+    users. The tables follow db.create_all() / db.drop_all(), and
+    upgrade_schema() builds and backfills them on databases that predate them.
+    Other engines report the table unavailable, as does a failing DDL when
+    ``unsupported_warning`` is set (e.g. SQLite built without FTS5).
+    """
+
+    def __init__(self, name, ddl, rebuild, also_drops=(), unsupported_warning=None):
+        self.name = name
+        self.ddl = ddl
+        self.rebuild = rebuild
+        self.tables = (name, *also_drops)
+        self.unsupported_warning = unsupported_warning
+        # Per-engine cache of whether the table exists
+        self._available = {}
+        MAINTAINED_TABLES.append(self)
+        db.event.listen(User.__table__, "after_create", lambda target, connection, **kw: self.create(connection))
+        db.event.listen(User.__table__, "before_drop", lambda target, connection, **kw: self.drop(connection))
+
+    def create(self, connection, rebuild=False):
+        """Create the table and its triggers, refilling it from the users with ``rebuild``; returns availability"""
+        available = False
+        if connection.dialect.name == "sqlite":
+            try:
+                for statement in self.ddl:
+                    connection.exec_driver_sql(statement)
+                if rebuild:
+                    for statement in self.rebuild:
+                        if isinstance(statement, str):
+                            connection.exec_driver_sql(statement)
+                        else:
+                            connection.execute(statement)
+                available = True
+            except db.exc.OperationalError as e:
+                if self.unsupported_warning is None:
+                    raise
+                current_app.logger.warning("%s: %s", self.unsupported_warning, e)
+        self._available[connection.engine.url] = available
+        return available
+
+    def drop(self, connection):
+        """Drop the tables (their triggers are dropped together with the user table)"""
+        if connection.dialect.name == "sqlite":
+            for table in self.tables:
+                connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+        self._available.pop(connection.engine.url, None)
+
+    def upgrade(self, connection):
+        """Build and backfill the table if the database predates it"""
+        if connection.dialect.name == "sqlite" and not sqlite_table_exists(connection, self.name):
+            self.create(connection, rebuild=True)
+
+    def available(self):
+        """Return True if the current engine has the table"""
+        engine = db.engine
+        if engine.url not in self._available:
+            with engine.connect() as connection:
+                self._available[engine.url] = sqlite_table_exists(connection, self.name)
+        return self._available[engine.url]
+
+
+# Full-Text Search Index
+
+# SQLite FTS5 external-content table over the searchable User columns.
+# Triggers keep it in sync with every insert, update and delete on "user".
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5(
+        first_name, last_name, city, content='user', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON user BEGIN
+        INSERT INTO user_fts(rowid, first_name, last_name, city)
+        VALUES (new.id, new.first_name, new.last_name, new.city);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON user BEGIN
+        INSERT INTO user_fts(user_fts, rowid, first_name, last_name, city)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.city);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF first_name, last_name, city ON user BEGIN
+        INSERT INTO user_fts(user_fts, rowid, first_name, last_name, city)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.city);
+        INSERT INTO user_fts(rowid, first_name, last_name, city)
+        VALUES (new.id, new.first_name, new.last_name, new.city);
+    END""",
+]
+
+user_fts = db.table("user_fts", db.column("rowid"), db.column("rank"))
+
+# Without the index (other engines, no FTS5) searches use the LIKE fallback
+search_index = MaintainedTable(
+    "user_fts",
+    SEARCH_INDEX_DDL,
+    ["INSERT INTO user_fts(user_fts) VALUES ('rebuild')"],
+    unsupported_warning="Full-text search index unavailable, using LIKE fallback",
+)
+search_index_available = search_index.available
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term ("lah"* matches Lahore) and all
+    words must match. Returns None if the text has nothing searchable.
+    """
+    terms = [term for term in query.split() if re.search(r"\w", term)]
+    if not terms:
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def like_search_predicate(query):
+    """Substring match on name and city, used when no FTS index is available"""
+    search_pattern = f"%{query}%"
+    return db.or_(
+        User.first_name.ilike(search_pattern),
+        User.last_name.ilike(search_pattern),
+        User.city.ilike(search_pattern),
+    )
+
+
+def user_search_predicate(query):
+    """Return a WHERE clause selecting users that match ``query``"""
+    match = build_match_query(query)
+    if match is None or not search_index_available():
+        return like_search_predicate(query)
+    matching_ids = db.select(user_fts.c.rowid).where(db.literal_column("user_fts").op("MATCH")(match))
+    return User.id.in_(matching_ids)
+
+
+def search_users_statement(query, limit=None, columns=None):
+    """
+    Build the SELECT returning up to ``limit`` users matching ``query``, best matches first.
+
+    Selects whole User objects, or only ``columns`` as plain rows.
+    """
+    limit = limit or current_app.config["SEARCH_RESULT_LIMIT"]
+    columns = columns or [User]
+    match = build_match_query(query)
+
+    if match is None or not search_index_available():
+        # Fallback path: full scan with LIKE, in insertion order
+        return db.select(*columns).where(like_search_predicate(query)).order_by(User.id).limit(limit)
+
+    # Indexed path: FTS5 lookup ordered by bm25 rank, joined back to the rows
+    return (
+        db.select(*columns)
+        .select_from(User)
+        .join(user_fts, user_fts.c.rowid == User.id)
+        .where(db.literal_column("user_fts").op("MATCH")(match))
+        .order_by(user_fts.c.rank)
+        .limit(limit)
+    )
+
+
+def search_users_ranked(query, limit=None):
+    """Return up to ``limit`` users matching ``query``, best matches first"""
+    return db.session.execute(search_users_statement(query, limit)).scalars().all()
+
+
+# Aggregate Statistics
+
+# Counter tables holding users per city and per age bucket. Triggers on "user"
+# keep them current for every write path (forms, API, batches, imports), so
+# /stats reads one row per group instead of scanning the users.
+AGE_BUCKET_SIZE = 10
+
+STATS_DDL = [
+    "CREATE TABLE IF NOT EXISTS user_city_stats (city VARCHAR(50) PRIMARY KEY, users INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS user_age_stats (age_bucket INTEGER PRIMARY KEY, users INTEGER NOT NULL)",
+    f"""CREATE TRIGGER IF NOT EXISTS user_stats_ai AFTER INSERT ON user BEGIN
+        INSERT INTO user_city_stats(city, users) VALUES (new.city, 1)
+            ON CONFLICT(city) DO UPDATE SET users = users + 1;
+        INSERT INTO user_age_stats(age_bucket, users) VALUES (new.age / {AGE_BUCKET_SIZE} * {AGE_BUCKET_SIZE}, 1)
+            ON CONFLICT(age_bucket) DO UPDATE SET users = users + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_stats_ad AFTER DELETE ON user BEGIN
+        UPDATE user_city_stats SET users = users - 1 WHERE city = old.city;
+        DELETE FROM user_city_stats WHERE city = old.city AND users <= 0;
+        UPDATE user_age_stats SET users = users - 1 WHERE age_bucket = old.age / {AGE_BUCKET_SIZE} * {AGE_BUCKET_SIZE};
+        DELETE FROM user_age_stats WHERE age_bucket = old.age / {AGE_BUCKET_SIZE} * {AGE_BUCKET_SIZE} AND users <= 0;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_stats_au AFTER UPDATE OF city, age ON user
+    WHEN old.city IS NOT new.city OR old.age / {AGE_BUCKET_SIZE} IS NOT new.age / {AGE_BUCKET_SIZE} BEGIN
+        UPDATE user_city_stats SET users = users - 1 WHERE city = old.city;
+        DELETE FROM user_city_stats WHERE city = old.city AND users <= 0;
+        UPDATE user_age_stats SET users = users - 1 WHERE age_bucket = old.age / {AGE_BUCKET_SIZE} * {AGE_BUCKET_SIZE};
+        DELETE FROM user_age_stats WHERE age_bucket = old.age / {AGE_BUCKET_SIZE} * {AGE_BUCKET_SIZE} AND users <= 0;
+        INSERT INTO user_city_stats(city, users) VALUES (new.city, 1)
+            ON CONFLICT(city) DO UPDATE SET users = users + 1;
+        INSERT INTO user_age_stats(age_bucket, users) VALUES (new.age / {AGE_BUCKET_SIZE} * {AGE_BUCKET_SIZE}, 1)
+            ON CONFLICT(age_bucket) DO UPDATE SET users = users + 1;
+    END""",
+]
+
+user_city_stats = db.table("user_city_stats", db.column("city"), db.column("users"))
+user_age_stats = db.table("user_age_stats", db.column("age_bucket"), db.column("users"))
+
+
+def city_counts_statement():
+    """Users per city, aggregated from the user table"""
+    return db.select(User.city, db.func.count()).group_by(User.city)
+
+
+def age_counts_statement():
+    """Users per age bucket, aggregated from the user table"""
+    bucket = User.age // AGE_BUCKET_SIZE * AGE_BUCKET_SIZE
+    return db.select(bucket, db.func.count()).group_by(bucket)
+
+
+# Rebuilding also repairs drift; without the tables /stats aggregates the users
+stats_tables = MaintainedTable(
+    "user_city_stats",
+    STATS_DDL,
+    [
+        db.delete(user_city_stats),
+        db.delete(user_age_stats),
+        db.insert(user_city_stats).from_select(["city", "users"], city_counts_statement()),
+        db.insert(user_age_stats).from_select(["age_bucket", "users"], age_counts_statement()),
+    ],
+    also_drops=["user_age_stats"],
+)
+stats_tables_available = stats_tables.available
+
+
+def user_stats(exact=False):
+    """
+    Return users per city (most first) and per age bucket, plus the total.
+
+    Reads the counter tables when they exist, one row per group. ``exact``
+    aggregates the user table instead, which is what rebuild_stats() checks
+    the counters against.
+    """
+    if exact or not stats_tables_available():
+        cities = db.session.execute(city_counts_statement()).all()
+        ages = db.session.execute(age_counts_statement()).all()
+    else:
+        cities = db.session.execute(db.select(user_city_stats.c.city, user_city_stats.c.users)).all()
+        ages = db.session.execute(db.select(user_age_stats.c.age_bucket, user_age_stats.c.users)).all()
+
+    cities = sorted(cities, key=lambda row: (-row[1], row[0]))
+    return {
+        "total": sum(users for _, users in cities),
+        "cities": [{"city": city, "users": users} for city, users in cities],
+        "ages": [
+            {"from": bucket, "to": bucket + AGE_BUCKET_SIZE - 1, "users": users} for bucket, users in sorted(ages)
+        ],
+    }
+
+
+def rebuild_stats():
+    """Recompute the counter tables from the user table, returning the stats from before the rebuild"""
+    before = user_stats()
+    stats_tables.create(db.session.connection(), rebuild=True)
+    db.session.commit()
+    return before
+
+
+# Search Suggestions
+
+# Prefix index for /search/suggest: one row per distinct first name, last name
+# and city with the number of users carrying it. Triggers maintain it like the
+# counter tables above, and prefixes are answered by a range scan on "term".
+SUGGEST_FIELDS = ("first_name", "last_name", "city")
+
+
+def _suggest_term_changes(row, delta, changed=None):
+    """Trigger statements adding ``delta`` users to the terms of ``row`` ("new" or "old")"""
+    statements = []
+    for field in SUGGEST_FIELDS:
+        only_if_changed = f" AND old.{field} IS NOT new.{field}" if changed else ""
+        if delta > 0:
+            statements.append(
+                f"""INSERT INTO user_terms(field, value, term, users)
+                SELECT '{field}', {row}.{field}, lower({row}.{field}), 1 WHERE 1{only_if_changed}
+                ON CONFLICT(field, value) DO UPDATE SET users = users + 1;"""
+            )
+        else:
+            statements.append(
+                f"""UPDATE user_terms SET users = users - 1
+                WHERE field = '{field}' AND value = {row}.{field}{only_if_changed};
+                DELETE FROM user_terms WHERE field = '{field}' AND value = {row}.{field} AND users <= 0;"""
+            )
+    return "\n".join(statements)
+
+
+SUGGEST_DDL = [
+    """CREATE TABLE IF NOT EXISTS user_terms (
+        field VARCHAR(20) NOT NULL, value VARCHAR(50) NOT NULL, term VARCHAR(50) NOT NULL,
+        users INTEGER NOT NULL, PRIMARY KEY (field, value)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_user_terms_term ON user_terms (term)",
+    f"""CREATE TRIGGER IF NOT EXISTS user_terms_ai AFTER INSERT ON user BEGIN
+        {_suggest_term_changes("new", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_terms_ad AFTER DELETE ON user BEGIN
+        {_suggest_term_changes("old", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_terms_au AFTER UPDATE OF {", ".join(SUGGEST_FIELDS)} ON user BEGIN
+        {_suggest_term_changes("old", -1, changed=True)}
+        {_suggest_term_changes("new", 1, changed=True)}
+    END""",
+]
+
+user_terms = db.table("user_terms", db.column("field"), db.column("value"), db.column("term"), db.column("users"))
+
+
+def terms_statement():
+    """Distinct (field, value, term, users) rows aggregated from the user table"""
+    return db.union_all(
+        *(
+            db.select(db.literal(field), column, db.func.lower(column), db.func.count()).group_by(column)
+            for field, column in ((field, getattr(User, field)) for field in SUGGEST_FIELDS)
+        )
+    )
+
+
+suggest_index = MaintainedTable(
+    "user_terms",
+    SUGGEST_DDL,
+    [db.delete(user_terms), db.insert(user_terms).from_select(["field", "value", "term", "users"], terms_statement())],
+)
+suggest_index_available = suggest_index.available
+
+
+def prefix_upper_bound(prefix):
+    """
+    Smallest string above every string starting with ``prefix``, or None if there is none.
+
+    The last character is incremented, skipping the surrogates (they cannot be
+    encoded); a U+10FFFF cannot be, so it is dropped and the carry moves left.
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if 0xD800 <= code <= 0xDFFF:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
+
+def prefix_range(column, prefix):
+    """WHERE clause for ``column`` starting with ``prefix``, as a range an index can seek"""
+    upper = prefix_upper_bound(prefix)
+    if upper is None:
+        return column >= prefix
+    return db.and_(column >= prefix, column < upper)
+
+
+def suggest_terms(prefix, limit=None):
+    """
+    Return up to ``limit`` (value, field, users) completions for ``prefix``, most common first.
+
+    The prefix is matched case-insensitively against the start of first
+    names, last names and cities. Without the prefix index the lower()
+    expression indexes on "user" are range scanned instead.
+    """
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    limit = limit or current_app.config["SUGGEST_LIMIT"]
+
+    if suggest_index_available():
+        statement = db.select(user_terms.c.value, user_terms.c.field, user_terms.c.users).where(
+            prefix_range(user_terms.c.term, prefix)
+        )
+    else:
+        statement = db.union_all(
+            *(
+                db.select(column.label("value"), db.literal(field).label("field"), db.func.count().label("users"))
+                .where(prefix_range(db.func.lower(column), prefix))
+                .group_by(column)
+                for field, column in ((field, getattr(User, field)) for field in SUGGEST_FIELDS)
+            )
+        ).subquery()
+        statement = db.select(statement.c.value, statement.c.field, statement.c.users)
 
+    columns = statement.selected_columns
+    return db.session.execute(statement.order_by(columns.users.desc(), columns.value, columns.field).limit(limit)).all()
 
-@app.route("/")
-def index():
 
-    # Get all users from database
-    users = User.query.all()
-    # Pass users to template (template will handle empty list case)
-    return render_template("index.html", users=users)
+# Keyset Pagination
 
+# Largest value a SQLite INTEGER holds; bigger ids cannot be bound as parameters
+SQLITE_MAX_INTEGER = 2**63 - 1
 
-@app.route("/add", methods=["GET", "POST"])
-def add_user():
 
-    if request.method == "POST":
-        # Get form data from request
-        first_name = request.form.get("first_name")
-        last_name = request.form.get("last_name")
-        email = request.form.get("email")
-        age = request.form.get("age")
-        city = request.form.get("city")
-
-        # Validate form data updated by ahmed
-        if not all([first_name, last_name, email, age, city]):
-            flash("All fields are required!", "error")
-            return render_template(TEMPLATE_ADD)
+def is_row_id(value):
+    """True for an int (not a bool) that can be a user id"""
+    return type(value) is int and 0 < value <= SQLITE_MAX_INTEGER
+
+
+# Sort options for user listings: name -> (column, descending)
+# Every sort is tie-broken on the primary key so cursors are always unique
+USER_SORTS = {
+    "id": (User.id, False),
+    "id_desc": (User.id, True),
+    "newest": (User.created_at, True),
+    "oldest": (User.created_at, False),
+    "name": (User.last_name, False),
+}
+DEFAULT_USER_SORT = "id"
+
+Page = namedtuple("Page", ["items", "next_cursor", "prev_cursor"])
+
+# What keyset_page() needs to know about the window keyset_window() selected
+KeysetWindow = namedtuple("KeysetWindow", ["column", "per_page", "backwards", "cursor"])
+
+
+def encode_cursor(column, row):
+    """Encode the sort key of a row as an opaque URL-safe cursor"""
+    value = getattr(row, column.key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, row.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(column, cursor):
+    """
+    Decode a cursor back into (sort value, id), or None if it is malformed.
+
+    Cursors come from the query string, so the values are checked against the
+    sort column's type: anything else would only fail once bound to the query.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not is_row_id(row_id):
+            return None
+        if isinstance(column.type, db.Integer):
+            return (value, row_id) if is_row_id(value) else None
+        if value is not None and not isinstance(value, str):
+            return None
+        if isinstance(column.type, db.DateTime) and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, row_id
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_window(query, sort=DEFAULT_USER_SORT, after=None, before=None, per_page=None):
+    """
+    Add the cursor filter, ordering and LIMIT for one page to ``query``.
+
+    Works on a legacy Query or a select() statement, so the async server can
+    run the same window. Returns the query and a KeysetWindow for keyset_page().
+    """
+    column, descending = USER_SORTS.get(sort, USER_SORTS[DEFAULT_USER_SORT])
+    per_page = per_page or current_app.config["USERS_PER_PAGE"]
+
+    # Paging backwards walks the index in the opposite direction
+    backwards = before is not None
+    reverse = descending != backwards
+    cursor = decode_cursor(column, before if backwards else after) if (before or after) else None
+
+    if cursor:
+        value, row_id = cursor
+        key = User.id if column is User.id else db.tuple_(column, User.id)
+        bound = row_id if column is User.id else db.tuple_(value, row_id)
+        query = query.where(key < bound if reverse else key > bound)
+
+    if column is User.id:
+        order = [User.id.desc() if reverse else User.id.asc()]
+    else:
+        order = [column.desc(), User.id.desc()] if reverse else [column.asc(), User.id.asc()]
+
+    # Fetch one extra row to find out whether another page exists
+    return query.order_by(*order).limit(per_page + 1), KeysetWindow(column, per_page, backwards, cursor)
+
+
+def keyset_page(rows, window):
+    """Turn the rows fetched for a keyset window into a Page with its cursors"""
+    has_more = len(rows) > window.per_page
+    rows = rows[: window.per_page]
+    if window.backwards:
+        rows.reverse()
+
+    has_next = has_more if not window.backwards else window.cursor is not None
+    has_prev = has_more if window.backwards else window.cursor is not None
+    next_cursor = encode_cursor(window.column, rows[-1]) if rows and has_next else None
+    prev_cursor = encode_cursor(window.column, rows[0]) if rows and has_prev else None
+    return Page(rows, next_cursor, prev_cursor)
+
+
+def paginate_keyset(query, sort=DEFAULT_USER_SORT, after=None, before=None, per_page=None):
+    """
+    Return one page of users ordered by ``sort`` using keyset pagination.
+
+    ``after`` / ``before`` are cursors taken from a previous page. Each page is
+    a single indexed range scan, so the cost does not grow with the page number.
+    """
+    query, window = keyset_window(query, sort, after, before, per_page)
+    return keyset_page(query.all(), window)
+
+
+def count_users():
+    """Count users with a single aggregate query instead of loading rows"""
+    return db.session.query(db.func.count(User.id)).scalar()
+
+
+# Validation
+
+USER_FIELDS = ("first_name", "last_name", "email", "age", "city")
+
+# Columns the listing and search templates print. Those pages select just
+# these as plain rows, skipping ORM identity map and attribute bookkeeping.
+USER_LIST_FIELDS = ("id",) + USER_FIELDS + ("created_at",)
+EMAIL_EXISTS_MESSAGE = "Email already exists! Please use a different email."
+
+
+def validate_user_fields(data, partial=False):
+    """
+    Validate submitted user fields (a form or any mapping).
 
-        # Check if age is a valid number
+    With ``partial`` only the fields present in ``data`` are checked (PATCH).
+    Returns (cleaned fields, None) on success or (None, error message).
+    """
+    fields = {name: data.get(name) for name in USER_FIELDS if not partial or name in data}
+    if partial and not fields:
+        return None, "No fields to update!"
+
+    # Validate form data updated by ahmed
+    # (a missing or empty value, not any falsy one: JSON age 0 gets the age error below)
+    if any(value is None or value == "" for value in fields.values()):
+        return None, "All fields are required!"
+
+    # Text fields must be strings (JSON imports can carry any type)
+    if not all(isinstance(value, str) for name, value in fields.items() if name != "age"):
+        return None, "Name, email and city must be text!"
+
+    # Check if age is a valid number
+    if "age" in fields:
+        # bool is an int subclass, but JSON true is not an age
+        if isinstance(fields["age"], bool):
+            return None, "Age must be a valid number!"
         try:
-            age = int(age)
-            if age <= 0 or age > 150:
-                flash("Please enter a valid age (1-150)!", "error")
-                return render_template(TEMPLATE_ADD)
-        except ValueError:
-            flash("Age must be a valid number!", "error")
-            return render_template(TEMPLATE_ADD)
+            fields["age"] = int(fields["age"])
+            if fields["age"] <= 0 or fields["age"] > 150:
+                return None, "Please enter a valid age (1-150)!"
+        except (TypeError, ValueError):
+            return None, "Age must be a valid number!"
+
+    return fields, None
+
+
+# Bulk Import
+
+IMPORT_FORMATS = {
+    "csv": "csv",
+    "text/csv": "csv",
+    "jsonl": "jsonl",
+    "ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+    "application/json-lines": "jsonl",
+}
+
+
+def decode_lines(stream, encoding="utf-8-sig", block_size=64 * 1024):
+    """
+    Yield the lines of a binary stream as text, decoding one line at a time.
+
+    Unlike io.TextIOWrapper this only needs ``read()``, which every WSGI input
+    has, and bad bytes raise UnicodeDecodeError on the line that holds them
+    rather than up to a block earlier. A leading byte order mark is dropped.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = b""
+    while block := stream.read(block_size):
+        lines = (pending + block).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield decoder.decode(line + b"\n")
+    if last := decoder.decode(pending, final=True):
+        yield last
+
+
+def undecodable_line_message(error):
+    return f"Invalid UTF-8 ({error.reason}), this and later lines were not imported"
+
+
+def iter_import_rows(stream, fmt):
+    """
+    Yield (line number, row) pairs from text lines (a text stream or decode_lines()) of CSV or JSON lines.
+
+    Rows that cannot be decoded are yielded as (line number, error message)
+    so they can be reported without aborting the import. A line that is not
+    valid UTF-8 is reported the same way, but ends the import there.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except UnicodeDecodeError as e:
+            yield reader.line_num + 1, undecodable_line_message(e)
+        return
+
+    line_number = 0
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, "Each line must be a JSON object"
+                continue
+            yield line_number, row
+    except UnicodeDecodeError as e:
+        yield line_number + 1, undecodable_line_message(e)
+
+
+def _chunks(iterable, size):
+    """Split an iterable into lists of at most ``size`` items"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def import_users(rows, chunk_size=None):
+    """
+    Validate and insert users from (line number, row) pairs in chunks.
+
+    Each chunk is validated with the same rules as the /add form, checked for
+    existing emails with one IN query, inserted with a single executemany and
+    committed as one transaction. Returns a summary dict with per-row errors.
+    """
+    chunk_size = chunk_size or current_app.config["IMPORT_CHUNK_SIZE"]
+    max_errors = current_app.config["IMPORT_MAX_REPORTED_ERRORS"]
+    summary = {"processed": 0, "inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def reject(line_number, message, email=None):
+        summary["failed"] += 1
+        if len(summary["errors"]) < max_errors:
+            summary["errors"].append({"line": line_number, "email": email, "error": message})
+        else:
+            summary["errors_truncated"] = True
+
+    for chunk in _chunks(rows, chunk_size):
+        summary["processed"] += len(chunk)
+
+        # Validate rows and drop duplicates inside the chunk
+        pending = {}
+        for line_number, row in chunk:
+            if isinstance(row, str):
+                reject(line_number, row)
+                continue
+            fields, error = validate_user_fields(row)
+            if error:
+                reject(line_number, error, row.get("email"))
+            elif fields["email"] in pending:
+                reject(line_number, "Duplicate email in import", fields["email"])
+            else:
+                pending[fields["email"]] = (line_number, fields)
+
+        if not pending:
+            continue
+
+        # Dedupe against the database with one query per chunk
+        existing = set(db.session.execute(db.select(User.email).where(User.email.in_(pending))).scalars())
+        for email in existing:
+            line_number, _ = pending.pop(email)
+            reject(line_number, EMAIL_EXISTS_MESSAGE, email)
+
+        if not pending:
+            continue
+
+        try:
+            # Core insert on the table skips per-row ORM bookkeeping
+            db.session.execute(User.__table__.insert(), [fields for _, fields in pending.values()])
+            db.session.commit()
+            invalidate_user_pages()
+            summary["inserted"] += len(pending)
+        except Exception as e:
+            db.session.rollback()
+            for line_number, fields in pending.values():
+                reject(line_number, f"Error adding user: {str(e)}", fields["email"])
+
+    return summary
+
+
+# Streaming Export
+
+EXPORT_COLUMNS = ("id", "first_name", "last_name", "email", "age", "city", "created_at")
+
+
+def iter_export_rows(query=""):
+    """
+    Yield user rows as plain tuples, optionally filtered like /search.
+
+    Rows are fetched ``EXPORT_BATCH_SIZE`` at a time from a server-side cursor
+    (``yield_per``), so memory use does not depend on the table size.
+    """
+    statement = db.select(*(getattr(User, name) for name in EXPORT_COLUMNS)).order_by(User.id)
+    if query:
+        statement = statement.where(user_search_predicate(query))
+    result = db.session.execute(statement.execution_options(yield_per=current_app.config["EXPORT_BATCH_SIZE"]))
+    yield from result
+
+
+def generate_csv(rows):
+    """Render rows as CSV, one chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in _chunks(rows, current_app.config["EXPORT_BATCH_SIZE"]):
+        writer.writerows([*row[:-1], row.created_at.isoformat() if row.created_at else ""] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def generate_jsonl(rows):
+    """Render rows as JSON lines, one chunk per fetched batch"""
+    for batch in _chunks(rows, current_app.config["EXPORT_BATCH_SIZE"]):
+        lines = []
+        for row in batch:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record["created_at"] = row.created_at.isoformat() if row.created_at else None
+            lines.append(json.dumps(record) + "\n")
+        yield "".join(lines)
+
+
+def export_response(generate, mimetype, filename):
+    """Build a streamed download response for the current request's filter"""
+    rows = iter_export_rows(request.args.get("query", ""))
+    return Response(
+        stream_with_context(generate(rows)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+# Change Feed
+
+# Append-only log of user writes for downstream consumers (/api/changes). Triggers
+# add one row per insert, update (naming the changed fields) and delete inside the
+# writing transaction, so every write path is covered. AUTOINCREMENT never hands
+# out a "seq" twice, even once compact_changes() has removed the row holding it.
+
+
+def _changed_fields():
+    """SQL expression listing the USER_FIELDS an UPDATE changed, comma separated"""
+    cases = " || ".join(
+        f"CASE WHEN old.{field} IS NOT new.{field} THEN ',{field}' ELSE '' END" for field in USER_FIELDS
+    )
+    return f"substr({cases}, 2)"
+
+
+CHANGES_DDL = [
+    """CREATE TABLE IF NOT EXISTS user_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT, op VARCHAR(6) NOT NULL, user_id INTEGER NOT NULL,
+        fields VARCHAR(100), changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_user_changes_user_id ON user_changes (user_id, seq)",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_ai AFTER INSERT ON user BEGIN
+        INSERT INTO user_changes(op, user_id) VALUES ('insert', new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_changes_ad AFTER DELETE ON user BEGIN
+        INSERT INTO user_changes(op, user_id) VALUES ('delete', old.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_changes_au AFTER UPDATE OF {", ".join(USER_FIELDS)} ON user
+    WHEN {" OR ".join(f"old.{field} IS NOT new.{field}" for field in USER_FIELDS)} BEGIN
+        INSERT INTO user_changes(op, user_id, fields) VALUES ('update', new.id, {_changed_fields()});
+    END""",
+]
+
+user_changes = db.table(
+    "user_changes",
+    db.column("seq"),
+    db.column("op"),
+    db.column("user_id"),
+    db.column("fields"),
+    db.column("changed_at", db.DateTime),
+)
+
+# Rebuilding restarts the log as one insert per existing user, the starting point for
+# databases created before the feed; without the log /api/changes is unavailable
+change_feed = MaintainedTable(
+    "user_changes",
+    CHANGES_DDL,
+    [
+        db.delete(user_changes),
+        db.insert(user_changes).from_select(
+            ["op", "user_id"], db.select(db.literal("insert"), User.id).order_by(User.id)
+        ),
+    ],
+)
+change_feed_available = change_feed.available
+
+
+def changes_statement(since, limit, fields):
+    """
+    Changes after ``since``, oldest first, each with the user's current ``fields``.
+
+    The user columns are NULL for deletes and for users deleted since the
+    change, so consumers get the data to apply without a request per user.
+    """
+    current_user = db.and_(User.id == user_changes.c.user_id, user_changes.c.op != "delete")
+    return (
+        db.select(user_changes, *projected_columns(fields, "id"))
+        .select_from(user_changes.outerjoin(User, current_user))
+        .where(user_changes.c.seq > since)
+        .order_by(user_changes.c.seq)
+        .limit(limit)
+    )
+
+
+def read_changes(since, limit, fields, wait=0):
+    """
+    Return up to ``limit`` changes after ``since``, waiting up to ``wait``
+    seconds for one to be committed if there are none yet.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        rows = db.session.execute(changes_statement(since, limit, fields)).all()
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return rows
+        # End the read transaction, so the next poll sees what was committed meanwhile
+        db.session.rollback()
+        time.sleep(min(current_app.config["CHANGES_POLL_INTERVAL"], remaining))
+
+
+def acquire_long_poll_slot():
+    """
+    Take one of the CHANGES_MAX_WAITERS long poll slots, or return None if the poll must not wait.
+
+    A sync worker serves one request at a time, so a poll waiting there would
+    take the whole worker out of rotation: it never gets a slot.
+    """
+    if not request.environ.get("wsgi.multithread"):
+        return None
+    config = current_app.config
+    return admission.acquire("changes_wait", config["CHANGES_MAX_WAITERS"], config["CHANGES_MAX_WAIT"] + 60)
+
+
+def serialize_change(row, fields):
+    """JSON-ready change entry; "fields" is null for inserts, deletes and compacted updates"""
+    return {
+        "seq": row.seq,
+        "op": row.op,
+        "user_id": row.user_id,
+        "fields": row.fields.split(",") if row.fields else None,
+        "changed_at": row.changed_at.isoformat(),
+        "user": serialize_user(row, fields) if row.id is not None else None,
+    }
+
+
+def compact_changes(retention_days=None):
+    """
+    Drop the entries older than the retention period that have a newer entry for the same user.
+
+    What is left of a user's history is its latest old entry, if it has no
+    newer one, and every entry inside the retention period. The first entry
+    left after a user's dropped ones absorbs them and loses its field list, so
+    consumers apply the full row; later entries keep theirs. Every cursor stays
+    valid: a consumer behind the dropped entries still sees the user's latest
+    state, and deletes are kept. Returns the number of entries removed.
+    """
+    days = current_app.config["CHANGES_RETENTION_DAYS"] if retention_days is None else retention_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    other = user_changes.alias("other")
+    removable = db.and_(
+        user_changes.c.changed_at < cutoff,
+        db.exists().where(other.c.user_id == user_changes.c.user_id, other.c.seq > user_changes.c.seq),
+    )
+
+    # Per user, the last entry to drop, and the entry right after it that absorbs the run
+    last_removed = (
+        db.select(user_changes.c.user_id, db.func.max(user_changes.c.seq).label("seq"))
+        .where(removable)
+        .group_by(user_changes.c.user_id)
+        .subquery()
+    )
+    absorbing = (
+        db.select(db.func.min(other.c.seq))
+        .select_from(
+            other.join(
+                last_removed, db.and_(other.c.user_id == last_removed.c.user_id, other.c.seq > last_removed.c.seq)
+            )
+        )
+        .group_by(other.c.user_id)
+    )
+    db.session.execute(db.update(user_changes).where(user_changes.c.seq.in_(absorbing)).values(fields=None))
+    removed = db.session.execute(db.delete(user_changes).where(removable)).rowcount
+    db.session.commit()
+    return removed
+
+
+# Response Cache
+
+# Every cached page is tagged with the data it shows, so writes drop only what they affect
+TAG_USER_LIST = "users:list"
+TAG_USER_SEARCH = "users:search"
+
+
+def user_tag(user_id):
+    """Cache tag for pages showing a single user"""
+    return f"user:{user_id}"
+
+
+def cached_page(*tags):
+    """
+    Cache the rendered HTML of a GET view in ``response_cache``.
+
+    Tags are strings or callables that receive the view's keyword arguments.
+    Requests with pending flash messages skip the cache, since the page
+    would contain messages meant for a single visitor, and so do clients
+    pinned to the primary after a write (the cache may hold a replica's view).
+    Compressed copies are cached next to the page, so hits skip compression too.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if session.get("_flashes") or pinned_to_primary():
+                return view(**kwargs)
+
+            key = "page:" + request.full_path
+            encoding = negotiated_encoding(request.headers.get("Accept-Encoding"))
+            if encoding:
+                body = response_cache.get(f"{key}|{encoding}")
+                if body is not None:
+                    return cached_page_response(body, "HIT", encoding)
+
+            page_tags = [tag(**kwargs) if callable(tag) else tag for tag in tags]
+            body = response_cache.get(key)
+            if body is not None:
+                compressed = compress_cached_page(key, body, encoding, page_tags)
+                if compressed is not None:
+                    return cached_page_response(compressed, "HIT", encoding)
+                return cached_page_response(body, "HIT")
+
+            response = make_response(view(**kwargs))
+            if response.status_code == 200 and response.mimetype == "text/html":
+                body = response.get_data()
+                response_cache.set(key, body, tags=page_tags)
+                compressed = compress_cached_page(key, body, encoding, page_tags)
+                if compressed is not None:
+                    response.set_data(compressed)
+                    response.headers["Content-Encoding"] = encoding
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cached_page_response(body, cache_status, encoding=None):
+    response = Response(body, mimetype="text/html")
+    response.headers["X-Cache"] = cache_status
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def compress_cached_page(key, body, encoding, tags):
+    """Compress a cached page for ``encoding`` and cache the result under its own key (None if not worth it)"""
+    if encoding is None or len(body) < current_app.config["COMPRESS_MIN_SIZE"]:
+        return None
+    compressed = compress(body, encoding, current_app.config["COMPRESS_LEVELS"][encoding])
+    response_cache.set(f"{key}|{encoding}", compressed, tags=tags)
+    return compressed
+
+
+def invalidate_user_pages(*user_ids):
+    """Drop cached listings and searches, plus the pages of the given users"""
+    response_cache.invalidate_tags(TAG_USER_LIST, TAG_USER_SEARCH, *(user_tag(user_id) for user_id in user_ids))
+
+
+# Compression
+
+
+def negotiated_encoding(accept_encoding):
+    """The encoding to compress a response with for this Accept-Encoding header, or None"""
+    if not current_app.config["COMPRESS_RESPONSES"]:
+        return None
+    return choose_encoding(accept_encoding)
+
+
+def compress_response(response):
+    """
+    Compress text responses for clients that accept gzip or brotli.
+
+    Bodies under COMPRESS_MIN_SIZE are sent as they are, since the saving
+    would not pay for the CPU. Streamed bodies are compressed chunk by chunk
+    while they are generated, so they keep streaming.
+    """
+    if not is_compressible(response.mimetype):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = negotiated_encoding(request.headers.get("Accept-Encoding"))
+    if (
+        encoding is None
+        or request.method == "HEAD"
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    level = current_app.config["COMPRESS_LEVELS"][encoding]
+    if response.direct_passthrough:
+        # A static file: small, so read it into memory and compress it whole
+        response.direct_passthrough = False
+        response.make_sequence()
+    if response.is_streamed:
+        response.response = compress_chunks(response.iter_encoded(), encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(compress(body, encoding, level))
+    response.headers["Content-Encoding"] = encoding
+
+    # The compressed bytes differ from the uncompressed ones, so a strong validator no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# Static Assets
+
+# Content hash of each static file, keyed by (path, mtime, size) so an edited file gets a new one
+_static_fingerprints = {}
+
+
+def static_fingerprint(filename):
+    """Short content hash of a file in the static folder, or None if there is no such file"""
+    path = safe_join(current_app.static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _static_fingerprints:
+        with open(path, "rb") as handle:
+            _static_fingerprints[key] = hashlib.sha256(handle.read()).hexdigest()[:12]
+    return _static_fingerprints[key]
+
+
+def fingerprint_static_urls(endpoint, values):
+    """url_defaults: url_for("static", ...) adds ?v=<content hash>, so a changed file gets a new URL"""
+    if endpoint == "static" and "v" not in values:
+        version = static_fingerprint(values.get("filename", ""))
+        if version:
+            values["v"] = version
+
+
+def cache_static_assets(response):
+    """Let browsers keep a static file for STATIC_MAX_AGE when it was requested by its current fingerprint"""
+    if request.endpoint != "static" or response.status_code not in (200, 304):
+        return response
+    version = request.args.get("v")
+    if version and version == static_fingerprint(request.view_args["filename"]):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config["STATIC_MAX_AGE"]
+        response.cache_control.immutable = True
+    return response
+
+
+# Instrumentation
+
+REQUEST_LATENCY = metrics.histogram("http_request_duration_seconds", "Request latency by endpoint")
+REQUESTS = metrics.counter("http_requests_total", "Requests by endpoint, method and status")
+TEMPLATE_RENDER = metrics.histogram("template_render_seconds", "Jinja render time by template")
+QUERY_LATENCY = metrics.histogram(
+    "db_query_duration_seconds",
+    "SQL statement time by endpoint",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+QUERIES_PER_REQUEST = metrics.histogram(
+    "db_queries_per_request", "SQL statements per request by endpoint", buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100)
+)
+SLOW_QUERIES = metrics.counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+CACHE_EVENTS = metrics.counter("page_cache_events_total", "Page cache hits, misses, evictions and invalidations")
+REJECTED_REQUESTS = metrics.counter(
+    "http_requests_rejected_total", "Requests refused by the rate limit (429) or the concurrency limit (503)"
+)
+
+
+def endpoint_label():
+    """Bounded label for the current request (unmatched URLs share one label)"""
+    return request.endpoint or "unmatched"
+
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+
+
+def record_request_metrics(response):
+    started = g.get("request_started")
+    if started is not None:
+        labels = {"endpoint": endpoint_label()}
+        metrics.observe(REQUEST_LATENCY, time.perf_counter() - started, labels)
+        metrics.observe(QUERIES_PER_REQUEST, g.get("query_count", 0), labels)
+        metrics.inc(REQUESTS, dict(labels, method=request.method, status=str(response.status_code)))
+        metrics.maybe_flush()
+    return response
+
+
+def start_template_timer(sender, template, context, **extra):
+    g.setdefault("template_started", []).append(time.perf_counter())
+
+
+def record_template_render(sender, template, context, **extra):
+    stack = g.get("template_started")
+    if stack:
+        metrics.observe(TEMPLATE_RENDER, time.perf_counter() - stack.pop(), {"template": template.name})
+
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def observe_query(endpoint, elapsed, statement):
+    """Record one statement's duration and log it if it was slow"""
+    metrics.observe(QUERY_LATENCY, elapsed, {"endpoint": endpoint})
+
+    # Log slow statements (without parameters, which may hold personal data); the threshold
+    # is an app setting, so statements run outside an app context are only timed
+    if has_app_context() and elapsed * 1000 >= current_app.config["SLOW_QUERY_MS"]:
+        metrics.inc(SLOW_QUERIES, {"endpoint": endpoint})
+        current_app.logger.warning(
+            "Slow query (%.1f ms) in %s: %s", elapsed * 1000, endpoint, " ".join(statement.split())
+        )
+
+
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    endpoint = endpoint_label() if has_request_context() else "none"
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+    observe_query(endpoint, elapsed, statement)
+
+
+@metrics.register_collector
+def collect_cache_stats():
+    # Snapshots taken outside an app (e.g. at exit) keep the counts of the last one taken inside
+    if not has_app_context():
+        return
+    for event, value in response_cache.stats.as_dict().items():
+        yield CACHE_EVENTS, {"backend": response_cache.name, "event": event}, value
+
+
+# Admission Control
+
+# Endpoints that hold a database connection for long (large scans, streams, long polls, batches)
+DB_HEAVY_ENDPOINTS = set()
+
+# Endpoints never rate limited: probes and scrapes must keep answering while the app sheds load
+UNLIMITED_ENDPOINTS = {"healthz", "readyz", "metrics_endpoint", "static"}
+
+
+def db_heavy(view):
+    """
+    Run a view (placed under @route and any @cached_page) only within DB_CONCURRENCY_LIMIT.
+
+    The slot is taken when the view itself runs, so a page served from the
+    cache needs none. It is kept until the response is closed.
+    """
+    DB_HEAVY_ENDPOINTS.add(view.__name__)
+
+    @wraps(view)
+    def wrapper(**kwargs):
+        rejection, g.admission_slot = acquire_db_slot(view.__name__)
+        if rejection is not None:
+            return rejection_response(*rejection)
+        return view(**kwargs)
+
+    return wrapper
+
+
+def check_rate_limit(endpoint, client):
+    """
+    Take a token from ``client``'s bucket for ``endpoint``.
+
+    Returns None, or a rejection (status, seconds to wait, message) if the client is over its rate.
+    """
+    if endpoint in UNLIMITED_ENDPOINTS:
+        return None
+    endpoint = endpoint or "unmatched"
+
+    limits = current_app.config["RATE_LIMITS"]
+    limit = limits.get(endpoint, limits.get("*"))
+    if limit:
+        wait = admission.take(f"{endpoint}:{client}", *limit)
+        if wait:
+            metrics.inc(REJECTED_REQUESTS, {"endpoint": endpoint, "reason": "rate_limited"})
+            return 429, math.ceil(wait), "Too many requests, slow down"
+    return None
+
+
+def acquire_db_slot(endpoint):
+    """
+    Take one of the DB_CONCURRENCY_LIMIT slots for a DB-heavy ``endpoint``.
+
+    Returns (rejection, slot) like check_rate_limit(); the slot must be handed
+    back with release_slot() once the response is sent.
+    """
+    concurrency_limit = current_app.config["DB_CONCURRENCY_LIMIT"]
+    if concurrency_limit <= 0:
+        return None, None
+    slot = admission.acquire("db", concurrency_limit, current_app.config["DB_SLOT_LEASE"])
+    if slot is None:
+        metrics.inc(REJECTED_REQUESTS, {"endpoint": endpoint, "reason": "overloaded"})
+        return (503, current_app.config["OVERLOAD_RETRY_AFTER"], "Server busy, try again shortly"), None
+    return None, slot
+
+
+def rejection_response(status, retry_after, message):
+    """Refusal with Retry-After: JSON for the API, plain text otherwise"""
+    headers = {"Retry-After": str(retry_after)}
+    if is_api_request():
+        return jsonify(error=message), status, headers
+    return Response(message + "\n", status=status, mimetype="text/plain", headers=headers)
+
+
+def admit_request():
+    """before_request: refuse a client over its rate early, before any cache lookup, template or query"""
+    rejection = check_rate_limit(request.endpoint, request.remote_addr)
+    return rejection_response(*rejection) if rejection is not None else None
+
+
+def release_slot(slot):
+    """Hand back a concurrency slot taken by acquire_db_slot() (None is ignored)"""
+    if slot is not None:
+        admission.release(slot)
 
-        # Check if email is unique
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user:
-            flash("Email already exists! Please use a different email.", "error")
+
+def hand_over_admission_slot(response):
+    """after_request: keep the concurrency slot until the server closes the response, after a streamed body"""
+    slot = g.pop("admission_slot", None)
+    if slot is not None:
+        # The app context is gone by the time the response is closed, so hold on to the backend itself
+        store = current_app.extensions["admission"]
+        response.call_on_close(lambda: store.release(slot))
+    return response
+
+
+def release_admission_slot(error=None):
+    """teardown_request: give back a slot no response took over (the request failed before after_request)"""
+    release_slot(g.pop("admission_slot", None))
+
+
+# Routes
+
+# Views are collected here and added to each app create_app() builds, with their
+# function names as endpoints (templates, metric labels and READ_ONLY_ENDPOINTS use them)
+ROUTES = []
+ERROR_HANDLERS = {}
+
+
+class RowIdConverter(IntegerConverter):
+    """
+    ``<row_id:name>``: a user id as an int that SQLite can bind.
+
+    No row has an id past SQLITE_MAX_INTEGER, so such ids become 0, which
+    matches no row either and gets the view's usual 404. Failing the match
+    instead would answer 405 for methods other than GET.
+    """
+
+    def to_python(self, value):
+        row_id = super().to_python(value)
+        return row_id if row_id <= SQLITE_MAX_INTEGER else 0
+
+
+def route(rule, **options):
+    """Register a view like app.route does, for the apps create_app() builds"""
+
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+
+    return decorator
+
+
+def errorhandler(code):
+    """Register an error handler like app.errorhandler does, for the apps create_app() builds"""
+
+    def decorator(handler):
+        ERROR_HANDLERS[code] = handler
+        return handler
+
+    return decorator
+
+
+@route("/")
+@cached_page(TAG_USER_LIST)
+@read_only
+@db_heavy
+def index():
+
+    # Read sort and page size options from the query string
+    sort = request.args.get("sort", DEFAULT_USER_SORT)
+    if sort not in USER_SORTS:
+        sort = DEFAULT_USER_SORT
+    per_page = request.args.get("per_page", current_app.config["USERS_PER_PAGE"], type=int)
+    per_page = max(1, min(per_page, current_app.config["USERS_MAX_PER_PAGE"]))
+
+    # Get one page of users from database, as plain rows of the displayed columns
+    page = paginate_keyset(
+        projected_query(USER_LIST_FIELDS),
+        sort=sort,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=per_page,
+    )
+    # Pass users to template (template will handle empty list case)
+    return render_template(
+        "index.html",
+        users=page.items,
+        page=page,
+        total=count_users(),
+        sort=sort,
+        sorts=USER_SORTS,
+        per_page=per_page,
+    )
+
+
+@route("/add", methods=["GET", "POST"])
+def add_user():
+
+    if request.method == "POST":
+        # Get and validate form data from request
+        fields, error = validate_user_fields(request.form)
+        if error:
+            flash(error, "error")
             return render_template(TEMPLATE_ADD)
 
         try:
             # Create new user object
-            new_user = User(first_name=first_name, last_name=last_name, email=email, age=age, city=city)
+            new_user = User(**fields)
 
-            # Add user to database
+            # Add user to database (the unique constraint on email rejects duplicates)
             db.session.add(new_user)
             db.session.commit()
+            invalidate_user_pages()
 
             # Add success message
             flash("User added successfully!", "success")
@@ -97,6 +1751,11 @@ def add_user():
             # Redirect to home page
             return redirect(url_for("index"))
 
+        except db.exc.IntegrityError:
+            db.session.rollback()
+            flash(EMAIL_EXISTS_MESSAGE, "error")
+            return render_template(TEMPLATE_ADD)
+
         except Exception as e:
             db.session.rollback()
             flash(f"Error adding user: {str(e)}", "error")
@@ -106,7 +1765,41 @@ def add_user():
     return render_template(TEMPLATE_ADD)
 
 
-@app.route("/view/<int:user_id>")
+@route("/import", methods=["POST"])
+@db_heavy
+def import_users_endpoint():
+    """Bulk import users from a streamed CSV or JSON lines request body"""
+
+    # Format comes from ?format= or the Content-Type header
+    requested = request.args.get("format") or request.mimetype
+    fmt = IMPORT_FORMATS.get(requested)
+    if fmt is None:
+        return jsonify(error="Unsupported format, send text/csv or application/x-ndjson"), 415
+
+    # Decode the body line by line as it arrives instead of buffering it in memory
+    summary = import_users(iter_import_rows(decode_lines(request.stream), fmt))
+    return jsonify(summary)
+
+
+@route("/export.csv")
+@read_only
+@db_heavy
+def export_csv():
+    """Stream all users (or those matching ?query=) as CSV"""
+    return export_response(generate_csv, "text/csv", "users.csv")
+
+
+@route("/export.jsonl")
+@read_only
+@db_heavy
+def export_jsonl():
+    """Stream all users (or those matching ?query=) as JSON lines"""
+    return export_response(generate_jsonl, "application/x-ndjson", "users.jsonl")
+
+
+@route("/view/<row_id:user_id>")
+@cached_page(user_tag)
+@read_only
 def view_user(user_id):
 
     # Get user by ID (returns 404 if not found)
@@ -116,68 +1809,53 @@ def view_user(user_id):
     return render_template("view.html", user=user)
 
 
-@app.route("/update/<int:user_id>", methods=["GET", "POST"])
+@route("/update/<row_id:user_id>", methods=["GET", "POST"])
 def update_user(user_id):
 
-    # Get user by ID (returns 404 if not found)
-    user = User.query.get_or_404(user_id)
-
     if request.method == "POST":
-        # Get form data from request
-        first_name = request.form.get("first_name")
-        last_name = request.form.get("last_name")
-        email = request.form.get("email")
-        age = request.form.get("age")
-        city = request.form.get("city")
-
-        # Validate form data
-        if not all([first_name, last_name, email, age, city]):
-            flash("All fields are required!", "error")
-            return render_template(TEMPLATE_UPDATE, user=user)
-
-        # Check if age is a valid number
-        try:
-            age = int(age)
-            if age <= 0 or age > 150:
-                flash("Please enter a valid age (1-150)!", "error")
-                return render_template(TEMPLATE_UPDATE, user=user)
-        except ValueError:
-            flash("Age must be a valid number!", "error")
-            return render_template(TEMPLATE_UPDATE, user=user)
-
-        # Check if email is unique (excluding current user)
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user and existing_user.id != user_id:
-            flash("Email already exists! Please use a different email.", "error")
-            return render_template(TEMPLATE_UPDATE, user=user)
+        # Get and validate form data from request
+        fields, error = validate_user_fields(request.form)
+        if error:
+            flash(error, "error")
+            return render_template(TEMPLATE_UPDATE, user=User.query.get_or_404(user_id))
 
         try:
-            # Update user object with new data
-            user.first_name = first_name
-            user.last_name = last_name
-            user.email = email
-            user.age = age
-            user.city = city
+            # Update the row in a single UPDATE ... WHERE id = ? statement
+            # (the unique constraint on email rejects duplicates)
+            result = db.session.execute(db.update(User).where(User.id == user_id).values(**fields))
 
             # Save changes to database
             db.session.commit()
+            invalidate_user_pages(user_id)
 
-            # Add success message
-            flash("User updated successfully!", "success")
-
-            # Redirect to home page
-            return redirect(url_for("index"))
+        except db.exc.IntegrityError:
+            db.session.rollback()
+            flash(EMAIL_EXISTS_MESSAGE, "error")
+            return render_template(TEMPLATE_UPDATE, user=User.query.get_or_404(user_id))
 
         except Exception as e:
             db.session.rollback()
             flash(f"Error updating user: {str(e)}", "error")
-            return render_template(TEMPLATE_UPDATE, user=user)
+            return render_template(TEMPLATE_UPDATE, user=User.query.get_or_404(user_id))
+
+        # No row matched, so the user does not exist
+        if result.rowcount == 0:
+            abort(404)
+
+        # Add success message
+        flash("User updated successfully!", "success")
+
+        # Redirect to home page
+        return redirect(url_for("index"))
+
+    # Get user by ID (returns 404 if not found)
+    user = User.query.get_or_404(user_id)
 
     # Render update form with current user data for GET request
     return render_template(TEMPLATE_UPDATE, user=user)
 
 
-@app.route("/delete/<int:user_id>")
+@route("/delete/<row_id:user_id>")
 def delete_user(user_id):
 
     # Get user by ID (returns 404 if not found)
@@ -187,6 +1865,7 @@ def delete_user(user_id):
         # Delete user from database
         db.session.delete(user)
         db.session.commit()
+        invalidate_user_pages(user_id)
 
         # Add success message
         flash(f"User {user.first_name} {user.last_name} deleted successfully!", "success")
@@ -199,55 +1878,654 @@ def delete_user(user_id):
     return redirect(url_for("index"))
 
 
-@app.route("/search")
+@route("/search")
+@cached_page(TAG_USER_SEARCH)
+@read_only
+@db_heavy
 def search_users():
 
     # Get search query from request
     query = request.args.get("query", "")
 
-    # Search users by first_name, last_name, or city
+    # Search users by first_name, last_name, or city (full-text index when available)
+    limit = current_app.config["SEARCH_RESULT_LIMIT"]
     if query:
-        search_pattern = f"%{query}%"
-        users = User.query.filter(
-            db.or_(
-                User.first_name.ilike(search_pattern),
-                User.last_name.ilike(search_pattern),
-                User.city.ilike(search_pattern),
-            )
-        ).all()
+        statement = search_users_statement(query, limit, projected_columns(USER_LIST_FIELDS))
+        users = db.session.execute(statement).all()
     else:
         users = []
 
     # Pass query and results to template
-    return render_template("search.html", users=users, query=query)
+    return render_template("search.html", users=users, query=query, limit=limit)
+
+
+@route("/search/suggest")
+@read_only
+def suggest_users():
+    """Name and city completions for ?q=, small enough to fetch on every keystroke"""
+    limit = request.args.get("limit", current_app.config["SUGGEST_LIMIT"], type=int)
+    limit = max(1, min(limit, current_app.config["SUGGEST_MAX_LIMIT"]))
+    suggestions = [
+        {"value": value, "field": field, "users": users}
+        for value, field, users in suggest_terms(request.args.get("q", ""), limit)
+    ]
+
+    # Browsers reuse the answer while the user types and deletes the same prefix
+    response = conditional_json(lambda: {"suggestions": suggestions}, make_etag(suggestions))
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["SUGGEST_MAX_AGE"]
+    return response
+
+
+# JSON API
+
+API_FIELDS = ("id",) + USER_FIELDS + ("created_at", "updated_at")
+
+
+def parse_api_fields(raw):
+    """Return a ?fields= projection as a list of column names, or None if it names unknown fields"""
+    if not raw:
+        return list(API_FIELDS)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    if not names or not set(names) <= set(API_FIELDS):
+        return None
+    return names
+
+
+def projected_columns(fields, *required):
+    """Columns for ``fields`` plus the ones needed internally (ids, cursors, ETags), without duplicates"""
+    return [getattr(User, name) for name in dict.fromkeys([*fields, *required])]
+
+
+def projected_query(fields, *required):
+    """Query selecting only ``fields`` plus the columns needed internally"""
+    return db.session.query(*projected_columns(fields, *required))
+
+
+def serialize_user(row, fields):
+    """Convert a user row to a JSON-ready dict containing only ``fields``"""
+    record = {}
+    for name in fields:
+        value = getattr(row, name)
+        record[name] = value.isoformat() if isinstance(value, datetime) else value
+    return record
+
+
+def make_etag(*parts):
+    """Build a weak ETag from row versions, without serializing the response body"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def is_current(etag, last_modified, if_none_match, if_modified_since):
+    """
+    Return True if a client holding ``if_none_match`` / ``if_modified_since`` is up to date.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if if_none_match:
+        return if_none_match.contains_weak(etag)
+    if last_modified and if_modified_since:
+        return last_modified.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def not_modified(etag, last_modified=None):
+    """Return True if the current request's cached copy is still current"""
+    return is_current(etag, last_modified, request.if_none_match, request.if_modified_since)
+
+
+def conditional_json(payload_factory, etag, last_modified=None, status=200):
+    """Return 304 when the client is up to date, otherwise serialize the payload"""
+    if not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload_factory())
+        response.status_code = status
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def api_error(message, status):
+    """JSON error response used by every /api route"""
+    return jsonify(error=message), status
+
+
+@route("/api/users", methods=["GET"])
+@read_only
+@db_heavy
+def api_list_users():
+    """List users with keyset pagination, ?fields= projection and ETag revalidation"""
+    fields = parse_api_fields(request.args.get("fields"))
+    if fields is None:
+        return api_error(f"Unknown field, choose from: {', '.join(API_FIELDS)}", 400)
+
+    sort = request.args.get("sort", DEFAULT_USER_SORT)
+    if sort not in USER_SORTS:
+        return api_error(f"Unknown sort, choose from: {', '.join(USER_SORTS)}", 400)
+    per_page = request.args.get("per_page", current_app.config["USERS_PER_PAGE"], type=int)
+    per_page = max(1, min(per_page, current_app.config["USERS_MAX_PER_PAGE"]))
+
+    sort_column = USER_SORTS[sort][0]
+    page = paginate_keyset(
+        projected_query(fields, "id", sort_column.key, "updated_at"),
+        sort=sort,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+        per_page=per_page,
+    )
+
+    # The ETag covers which rows are on the page and their versions, so deletes change it too.
+    # No Last-Modified here: a deleted row leaves no timestamp behind to compare against.
+    etag = make_etag(fields, page.next_cursor, page.prev_cursor, [(row.id, row.updated_at) for row in page.items])
+    return conditional_json(
+        lambda: {
+            "users": [serialize_user(row, fields) for row in page.items],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        },
+        etag,
+    )
+
+
+@route("/api/users", methods=["POST"])
+def api_create_user():
+    """Create a user from a JSON body, validated like the /add form"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return api_error("Request body must be a JSON object", 400)
+
+    fields, error = validate_user_fields(data)
+    if error:
+        return api_error(error, 400)
+
+    try:
+        user = User(**fields)
+        db.session.add(user)
+        db.session.commit()
+        invalidate_user_pages()
+    except db.exc.IntegrityError:
+        db.session.rollback()
+        return api_error(EMAIL_EXISTS_MESSAGE, 409)
+
+    response = jsonify(serialize_user(user, API_FIELDS))
+    response.status_code = 201
+    response.headers["Location"] = url_for("api_get_user", user_id=user.id)
+    return response
+
+
+@route("/api/users/<row_id:user_id>", methods=["GET"])
+@read_only
+def api_get_user(user_id):
+    """Return one user, or 304 if the client's ETag / Last-Modified is still current"""
+    fields = parse_api_fields(request.args.get("fields"))
+    if fields is None:
+        return api_error(f"Unknown field, choose from: {', '.join(API_FIELDS)}", 400)
+
+    row = projected_query(fields, "id", "updated_at").filter(User.id == user_id).first()
+    if row is None:
+        return api_error("User not found", 404)
+
+    etag = make_etag(fields, row.id, row.updated_at)
+    return conditional_json(lambda: serialize_user(row, fields), etag, row.updated_at)
+
+
+@route("/api/users/<row_id:user_id>", methods=["PATCH"])
+def api_update_user(user_id):
+    """Update the given fields with a single UPDATE statement"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return api_error("Request body must be a JSON object", 400)
+
+    fields, error = validate_user_fields(data, partial=True)
+    if error:
+        return api_error(error, 400)
+
+    try:
+        result = db.session.execute(db.update(User).where(User.id == user_id).values(**fields))
+        db.session.commit()
+        invalidate_user_pages(user_id)
+    except db.exc.IntegrityError:
+        db.session.rollback()
+        return api_error(EMAIL_EXISTS_MESSAGE, 409)
+
+    if result.rowcount == 0:
+        return api_error("User not found", 404)
+    return jsonify(serialize_user(db.session.get(User, user_id), API_FIELDS))
+
+
+@route("/api/users/<row_id:user_id>", methods=["DELETE"])
+def api_delete_user(user_id):
+    """Delete a user with a single DELETE statement"""
+    result = db.session.execute(db.delete(User).where(User.id == user_id))
+    db.session.commit()
+    invalidate_user_pages(user_id)
+    if result.rowcount == 0:
+        return api_error("User not found", 404)
+    return Response(status=204)
+
+
+# Batch Operations
+
+# Columns a batch filter may match, ignoring case for text (email is unique, so it selects at most one user)
+BATCH_FILTER_FIELDS = ("first_name", "last_name", "age", "city")
+
+
+def parse_batch_selection(data):
+    """
+    Turn a batch request body into (ids, predicate, error).
+
+    The body selects users either by ``"ids": [1, 2, ...]`` or by
+    ``"filter": {"query": "...", "city": "..."}``, where ``query`` matches like
+    /search and the other keys are exact matches (ignoring case for text). Exactly one of ids or
+    predicate is returned, or an error message.
+    """
+    if ("ids" in data) == ("filter" in data):
+        return None, None, 'Select users with either "ids" or "filter"'
+
+    if "ids" in data:
+        ids = data["ids"]
+        if not isinstance(ids, list) or not ids or not all(is_row_id(i) for i in ids):
+            return None, None, '"ids" must be a non-empty list of positive integers'
+        return ids, None, None
+
+    conditions = data["filter"]
+    if not isinstance(conditions, dict) or not conditions:
+        return None, None, '"filter" must be an object with at least one condition'
+    unknown = set(conditions) - {"query", *BATCH_FILTER_FIELDS}
+    if unknown:
+        return None, None, f"Unknown filter field, choose from: query, {', '.join(BATCH_FILTER_FIELDS)}"
+
+    clauses = []
+    for name, value in conditions.items():
+        if name == "age":
+            # bool is an int subclass, and lists or strings would not fail until the query runs
+            if type(value) is not int or not 0 < value <= 150:
+                return None, None, '"age" must be an integer (1-150)'
+            clauses.append(User.age == value)
+        elif name != "query":
+            # Case-insensitive, so the match is answered from the lower() index
+            if not isinstance(value, str):
+                return None, None, f'"{name}" must be text'
+            clauses.append(db.func.lower(getattr(User, name)) == value.lower())
+    if "query" in conditions:
+        if not isinstance(conditions["query"], str) or not conditions["query"].strip():
+            return None, None, '"query" must be non-empty text'
+        clauses.append(user_search_predicate(conditions["query"]))
+    return None, db.and_(*clauses), None
+
+
+def selected_ids_statement(predicate, last_id=0, chunk_size=None):
+    """Build the SELECT for the next ``chunk_size`` ids after ``last_id`` matching ``predicate``"""
+    chunk_size = chunk_size or current_app.config["BATCH_CHUNK_SIZE"]
+    return db.select(User.id).where(predicate, User.id > last_id).order_by(User.id).limit(chunk_size)
+
+
+def iter_selected_ids(ids=None, predicate=None, chunk_size=None):
+    """Yield the selected user ids in ascending chunks of at most ``chunk_size``"""
+    chunk_size = chunk_size or current_app.config["BATCH_CHUNK_SIZE"]
+    if ids is not None:
+        yield from _chunks(sorted(set(ids)), chunk_size)
+        return
+
+    # Walk the matches by primary key, so each chunk is one indexed range scan
+    last_id = 0
+    while True:
+        chunk = db.session.execute(selected_ids_statement(predicate, last_id, chunk_size)).scalars().all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def run_batch(statement, ids=None, predicate=None, chunk_size=None):
+    """
+    Run a set-based UPDATE or DELETE over the selected users in one transaction.
+
+    Each chunk is a single ``... WHERE id IN (...)`` statement; filter
+    selections repeat the filter in the WHERE so rows changed meanwhile are
+    skipped. The search index follows through its triggers, and the cached
+    pages of affected users are dropped after the commit. Returns the number
+    of rows changed.
+    """
+    affected = 0
+    touched = []
+    try:
+        for chunk in iter_selected_ids(ids, predicate, chunk_size):
+            chunk_statement = statement.where(User.id.in_(chunk))
+            if predicate is not None:
+                chunk_statement = chunk_statement.where(predicate)
+            affected += db.session.execute(chunk_statement).rowcount
+            touched.extend(chunk)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Dropping a tag per user is cheap for small batches; clear everything for large ones
+    if len(touched) <= current_app.config["BATCH_MAX_INVALIDATED_PAGES"]:
+        invalidate_user_pages(*touched)
+    else:
+        response_cache.clear()
+    return affected
+
+
+@route("/api/users/batch-update", methods=["POST"])
+@db_heavy
+def api_batch_update_users():
+    """Set the same fields on every selected user: {"ids" or "filter", "values": {...}}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return api_error("Request body must be a JSON object", 400)
+
+    ids, predicate, error = parse_batch_selection(data)
+    if error:
+        return api_error(error, 400)
+
+    values = data.get("values")
+    if not isinstance(values, dict):
+        return api_error('"values" must be an object of fields to set', 400)
+    if "email" in values:
+        return api_error("Email is unique and cannot be set on several users", 400)
+    fields, error = validate_user_fields(values, partial=True)
+    if error:
+        return api_error(error, 400)
+
+    updated = run_batch(db.update(User).values(**fields), ids, predicate)
+    return jsonify(updated=updated)
+
+
+@route("/api/users/batch-delete", methods=["POST"])
+@db_heavy
+def api_batch_delete_users():
+    """Delete every selected user: {"ids": [...]} or {"filter": {...}}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return api_error("Request body must be a JSON object", 400)
+
+    ids, predicate, error = parse_batch_selection(data)
+    if error:
+        return api_error(error, 400)
+
+    deleted = run_batch(db.delete(User), ids, predicate)
+    return jsonify(deleted=deleted)
+
+
+@route("/stats")
+@read_only
+@cached_page(TAG_USER_LIST)
+def stats():
+    """Users per city and age distribution, read from the counter tables"""
+    return render_template("stats.html", stats=user_stats())
+
+
+@route("/api/stats")
+@read_only
+def api_stats():
+    """JSON form of /stats, with ETag revalidation"""
+    stats = user_stats()
+    return conditional_json(lambda: stats, make_etag(stats))
+
+
+@route("/api/changes")
+@db_heavy
+def api_changes():
+    """Users inserted, updated and deleted after ?since=<seq>, oldest first; ?wait=<seconds> long-polls"""
+    if not change_feed_available():
+        return api_error("The change feed is not available on this database", 501)
+    fields = parse_api_fields(request.args.get("fields"))
+    if fields is None:
+        return api_error(f"Unknown field, choose from: {', '.join(API_FIELDS)}", 400)
+
+    since = request.args.get("since", 0, type=int)
+    if not 0 <= since <= SQLITE_MAX_INTEGER:
+        return api_error("since must be a sequence number from an earlier response", 400)
+    limit = request.args.get("limit", current_app.config["CHANGES_PER_PAGE"], type=int)
+    limit = max(1, min(limit, current_app.config["CHANGES_MAX_PER_PAGE"]))
+    wait = max(0.0, min(request.args.get("wait", 0, type=float), current_app.config["CHANGES_MAX_WAIT"]))
+
+    slot = acquire_long_poll_slot() if wait else None
+    try:
+        rows = read_changes(since, limit + 1, fields, wait if slot is not None else 0)
+    finally:
+        release_slot(slot)
+    changes = [serialize_change(row, fields) for row in rows[:limit]]
+    return jsonify(changes=changes, next=changes[-1]["seq"] if changes else since, has_more=len(rows) > limit)
+
+
+@route("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of this worker's response cache"""
+    return jsonify(backend=response_cache.name, size=response_cache.size(), **response_cache.stats.as_dict())
+
+
+@route("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics for every worker sharing METRICS_DIR"""
+    metrics.flush()
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Health Checks
+
+# Single background thread that runs readiness pings so they can be timed out
+_readiness_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readyz")
+
+
+def ping_database(engine):
+    """Run the cheapest possible round trip against the database"""
+    with engine.connect() as connection:
+        connection.execute(db.text("SELECT 1"))
+
+
+@route("/healthz")
+def healthz():
+    """Liveness probe: the process is up and serving requests (no DB access)"""
+    return jsonify(status="ok")
+
+
+@route("/readyz")
+def readyz():
+    """Readiness probe: the database answers a ping within READINESS_TIMEOUT"""
+    future = _readiness_executor.submit(ping_database, db.engine)
+    try:
+        future.result(timeout=current_app.config["READINESS_TIMEOUT"])
+    except FutureTimeoutError:
+        return jsonify(status="unavailable", error="database ping timed out"), 503
+    except Exception as e:
+        return jsonify(status="unavailable", error=str(e)), 503
+    return jsonify(status="ok")
 
 
 # Error Handlers
 
 
-@app.errorhandler(404)
+def is_api_request():
+    return request.path.startswith("/api/")
+
+
+@errorhandler(404)
 def not_found_error(error):
     """Handle 404 errors"""
+    if is_api_request():
+        return api_error("Not found", 404)
     return render_template("404.html"), 404
 
 
-@app.errorhandler(500)
+@errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
     db.session.rollback()
+    if is_api_request():
+        return api_error("Internal server error", 500)
     return render_template("500.html"), 500
 
 
+@errorhandler(HTTPException)
+def http_error(error):
+    """Other HTTP errors (405, 413, ...): JSON for API clients, werkzeug's page for browsers"""
+    if is_api_request():
+        return api_error(error.description, error.code)
+    return error
+
+
 # Database initialization
+def upgrade_schema(connection):
+    """Bring databases created by older versions of the app up to the current model"""
+    table = connection.dialect.identifier_preparer.quote(User.__tablename__)
+    columns = {column["name"] for column in db.inspect(connection).get_columns(User.__tablename__)}
+
+    # updated_at was added for API conditional requests
+    if "updated_at" not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+        connection.exec_driver_sql(f"UPDATE {table} SET updated_at = created_at")
+
+    # Indexes added to the model since the database was created; refresh planner statistics after building them
+    if connection.dialect.name == "sqlite":
+        # The SQLite inspector skips expression indexes, so read the names from the catalog
+        existing = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    else:
+        existing = {index["name"] for index in db.inspect(connection).get_indexes(User.__tablename__)}
+    missing = [index for index in User.__table__.indexes if index.name not in existing]
+    for index in missing:
+        index.create(connection)
+    if missing:
+        connection.exec_driver_sql(f"ANALYZE {table}")
+
+    # Databases created before the search index, the counter tables, the prefix
+    # index or the change feed existed need them built and backfilled
+    for table in MAINTAINED_TABLES:
+        table.upgrade(connection)
+
+
 def create_tables():
     """Create database tables"""
+    if not has_app_context():
+        with get_app().app_context():
+            return create_tables()
+    db.create_all()
+    with db.engine.begin() as connection:
+        upgrade_schema(connection)
+    print("Database tables created successfully!")
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create the tables, or bring an existing database up to date"""
+    create_tables()
+
+
+# Application Factory
+
+
+def create_app(config=None):
+    """
+    Build the Flask app: settings from the environment (``config`` overrides
+    them), the database engines and their listeners, routes and CLI commands.
+
+    The page cache and admission backends live in ``app.extensions``, but the
+    metrics registry and replica router are module-level, so a process serves
+    one app; use get_app() (or ``from app import app``) for the default one.
+    """
+    app = Flask(__name__)
+    load_config(app)
+    app.config.update(config or {})
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", build_engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+
+    # Extensions
+    db.init_app(app)
+    app.extensions["response_cache"] = create_cache(
+        app.config["CACHE_BACKEND"],
+        path=app.config["CACHE_PATH"],
+        max_entries=app.config["CACHE_MAX_ENTRIES"],
+        default_ttl=app.config["CACHE_TTL"],
+    )
+    app.extensions["admission"] = create_admission(app.config["ADMISSION_BACKEND"], path=app.config["ADMISSION_PATH"])
+    metrics.configure(app.config["METRICS_DIR"], flush_interval=app.config["METRICS_FLUSH_INTERVAL"])
+
+    # Engine listeners and replicas
+    with app.app_context():
+        register_sqlite_pragmas(db.engine, app.config["SQLITE_PRAGMAS"])
+        for key in app.config["SQLALCHEMY_BINDS"]:
+            # query_only makes an accidental write to a replica fail instead of diverging from the primary
+            register_sqlite_pragmas(db.engines[key], dict(app.config["SQLITE_PRAGMAS"], query_only=1))
+        for engine in db.engines.values():
+            db.event.listen(engine, "before_cursor_execute", start_query_timer)
+            db.event.listen(engine, "after_cursor_execute", record_query)
+        replica_router.configure(
+            (db.engines[key] for key in app.config["SQLALCHEMY_BINDS"]), strategy=app.config["REPLICA_STRATEGY"]
+        )
+
+    # Templates and static files: compiled templates are shared through the bytecode cache,
+    # so a fresh worker loads them instead of parsing every template again
+    if app.config["JINJA_BYTECODE_CACHE"] != "none":
+        if app.config["JINJA_BYTECODE_CACHE"]:
+            os.makedirs(app.config["JINJA_BYTECODE_CACHE"], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["JINJA_BYTECODE_CACHE"] or None)
+    app.url_defaults(fingerprint_static_urls)
+
+    # Instrumentation
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+
+    # Admission control (after the timer, so refused requests are measured too)
+    app.before_request(admit_request)
+    app.after_request(hand_over_admission_slot)
+    app.teardown_request(release_admission_slot)
+    before_render_template.connect(start_template_timer, app)
+    template_rendered.connect(record_template_render, app)
+
+    # Response headers and compression (after_request hooks run last-registered first,
+    # so compression sees the final headers and the request metrics see the compressed response)
+    app.after_request(compress_response)
+    app.after_request(cache_static_assets)
+
+    # Routes, error handlers and CLI commands
+    app.url_map.converters["row_id"] = RowIdConverter
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    for code, handler in ERROR_HANDLERS.items():
+        app.register_error_handler(code, handler)
+    app.cli.add_command(init_db_command)
+    return app
+
+
+def get_app():
+    """Return the process's default app, building it on first use"""
+    if "app" not in globals():
+        globals()["app"] = create_app()
+    return globals()["app"]
+
+
+def __getattr__(name):
+    # "from app import app" (gunicorn's app:app, asgi.py, scripts, tests) builds the default app lazily,
+    # so importing this module for its models or helpers creates no app or engine
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Preforking Servers
+
+
+def precompile_templates(app):
+    """Compile every template now, so workers forked afterwards share the compiled code"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def dispose_engines(app):
+    """In a forked worker, drop pooled connections inherited from the parent without closing them for it"""
     with app.app_context():
-        db.create_all()
-        print("Database tables created successfully!")
+        for engine in db.engines.values():
+            engine.dispose(close=False)
 
 
 # Application entry point
 if __name__ == "__main__":
+    app = get_app()
 
     # Create database tables
     create_tables()
@@ -0,0 +1,496 @@
+"""
+ASGI entry point for the Flask CRUD application
+
+Serves the same routes as app.py under an ASGI server such as uvicorn. The
+read paths that carry most of the traffic (the user list, user pages,
+search, the JSON read API and the health checks) run natively on an async
+SQLAlchemy engine, so a request waiting on the database does not hold a
+thread. Every other route (forms, writes, import/export, metrics) is handed
+to the Flask app on a bounded thread pool: SQLite allows one writer at a
+time, so writes gain nothing from running async.
+
+Usage:
+    uvicorn asgi:application --host 0.0.0.0 --port 8080 --workers 4 --limit-concurrency 1000
+"""
+
+import asyncio
+import os
+import re
+import time
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from flask import render_template
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from compression import compress, is_compressible
+from werkzeug.http import http_date, parse_cookie, parse_date, parse_etags, quote_etag
+
+from app import (
+    acquire_db_slot,
+    check_rate_limit,
+    compress_cached_page,
+    negotiated_encoding,
+    API_FIELDS,
+    DEFAULT_USER_SORT,
+    QUERIES_PER_REQUEST,
+    REQUEST_LATENCY,
+    REQUESTS,
+    TAG_USER_LIST,
+    TAG_USER_SEARCH,
+    USER_LIST_FIELDS,
+    USER_SORTS,
+    User,
+    app,
+    build_engine_options,
+    db,
+    is_current,
+    is_row_id,
+    keyset_page,
+    keyset_window,
+    make_etag,
+    metrics,
+    observe_query,
+    parse_api_fields,
+    projected_columns,
+    register_sqlite_pragmas,
+    release_slot,
+    response_cache,
+    search_index_available,
+    search_users_statement,
+    serialize_user,
+    start_query_timer,
+    user_tag,
+)
+
+# Async drivers for each database backend (override with ASYNC_DATABASE_URI)
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+# Connections in the async pool; far more requests than this can wait on the database at once
+app.config["ASGI_DB_POOL_SIZE"] = int(os.getenv("ASGI_DB_POOL_SIZE", "20"))
+app.config["ASGI_DB_MAX_OVERFLOW"] = int(os.getenv("ASGI_DB_MAX_OVERFLOW", "20"))
+
+# Threads running the routes that are served by the Flask app
+app.config["ASGI_WSGI_THREADS"] = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+
+
+def async_database_uri(uri):
+    """Return ``uri`` (a string or URL) with its driver swapped for the backend's async driver"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URI")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_engine_for(uri):
+    """Create the async engine with the app's pooling options and SQLite pragmas"""
+    options = build_engine_options(uri)
+    if "pool_size" in options:
+        options.update(pool_size=app.config["ASGI_DB_POOL_SIZE"], max_overflow=app.config["ASGI_DB_MAX_OVERFLOW"])
+    engine = create_async_engine(uri, **options)
+    register_sqlite_pragmas(engine.sync_engine, app.config["SQLITE_PRAGMAS"])
+    db.event.listen(engine.sync_engine, "before_cursor_execute", start_query_timer)
+    db.event.listen(engine.sync_engine, "after_cursor_execute", record_async_query)
+    return engine
+
+
+# Endpoint and statement count of the request being served natively (None outside of one)
+request_stats = ContextVar("request_stats", default=None)
+
+
+def record_async_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    stats = request_stats.get()
+    if stats is not None:
+        stats["queries"] += 1
+    observe_query(stats["endpoint"] if stats else "none", elapsed, statement)
+
+
+# Derived from the URL Flask-SQLAlchemy resolved (a relative SQLite path lives in the instance folder),
+# so both engines open the same database
+with app.app_context():
+    primary_url = db.engine.url
+async_engine = create_engine_for(os.getenv("ASYNC_DATABASE_URI") or async_database_uri(primary_url))
+
+# Routes without a native handler run in the Flask app
+wsgi_application = WSGIMiddleware(app, workers=app.config["ASGI_WSGI_THREADS"])
+
+
+# Requests and Responses
+
+
+class Request:
+    """The parts of an ASGI HTTP request the native handlers need"""
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query_string = scope["query_string"].decode("latin-1")
+        self.args = {name: values[0] for name, values in parse_qs(self.query_string, keep_blank_values=True).items()}
+        self.headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        self.cookies = parse_cookie(self.headers.get("cookie", ""))
+
+    @property
+    def full_path(self):
+        """Path and query string, formatted like Flask's request.full_path"""
+        return f"{self.path}?{self.query_string}"
+
+    def int_arg(self, name, default):
+        """Integer query argument, or ``default`` if missing or not a number"""
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return default
+
+
+def html_response(body, status=200):
+    return status, body.encode(), [("content-type", "text/html; charset=utf-8")]
+
+
+def json_response(payload, status=200, headers=()):
+    body = (app.json.dumps(payload) + "\n").encode()
+    return status, body, [("content-type", "application/json"), *headers]
+
+
+def render_page(request, template, **context):
+    """Render a template inside a Flask request context, so url_for and request work as usual"""
+    with app.test_request_context(request.path, query_string=request.query_string):
+        return render_template(template, **context)
+
+
+def conditional_json(request, payload_factory, etag, last_modified=None):
+    """Return 304 when the client is up to date, otherwise serialize the payload"""
+    headers = [("etag", quote_etag(etag, weak=True))]
+    if last_modified:
+        headers.append(("last-modified", http_date(last_modified)))
+    if_none_match = parse_etags(request.headers.get("if-none-match"))
+    if_modified_since = parse_date(request.headers.get("if-modified-since"))
+    if is_current(etag, last_modified, if_none_match, if_modified_since):
+        return 304, b"", headers
+    return json_response(payload_factory(), headers=headers)
+
+
+def api_error(message, status):
+    return json_response({"error": message}, status)
+
+
+def rejected_response(request, status, retry_after, message):
+    """Counterpart of app.rejection_response: JSON for the API, plain text otherwise"""
+    headers = [("retry-after", str(retry_after))]
+    if request.path.startswith("/api/"):
+        return json_response({"error": message}, status, headers)
+    return status, (message + "\n").encode(), [("content-type", "text/plain; charset=utf-8"), *headers]
+
+
+async def call_admission(function, *args):
+    """
+    Run an admission check in an app context. The sqlite backend may wait up
+    to its busy timeout for the file's lock, so it runs in a thread instead of
+    stalling every request on the event loop; the others answer from memory.
+    """
+
+    def call():
+        with app.app_context():
+            return function(*args)
+
+    if app.extensions["admission"].name == "sqlite":
+        return await asyncio.to_thread(call)
+    return call()
+
+
+def db_heavy(handler):
+    """Async counterpart of app.db_heavy (placed under @cached_page, so cache hits take no slot)"""
+
+    async def wrapper(request, **kwargs):
+        rejection, slot = await call_admission(acquire_db_slot, handler.__name__)
+        if rejection is not None:
+            return rejected_response(request, *rejection)
+        try:
+            return await handler(request, **kwargs)
+        finally:
+            if slot is not None:
+                await call_admission(release_slot, slot)
+
+    return wrapper
+
+
+def clamp_per_page(request):
+    per_page = request.int_arg("per_page", app.config["USERS_PER_PAGE"])
+    return max(1, min(per_page, app.config["USERS_MAX_PER_PAGE"]))
+
+
+def cached_page(*tags):
+    """Async counterpart of app.cached_page, sharing the same cache keys and tags"""
+
+    def decorator(handler):
+        async def wrapper(request, **kwargs):
+            # The cache is a dict lookup (memory) or a local SQLite read, cheap enough to run inline
+            key = "page:" + request.full_path
+            encoding = negotiated_encoding(request.headers.get("accept-encoding"))
+            if encoding:
+                body = response_cache.get(f"{key}|{encoding}")
+                if body is not None:
+                    return cached_page_response(body, "HIT", encoding)
+
+            page_tags = [tag(**kwargs) if callable(tag) else tag for tag in tags]
+            body = response_cache.get(key)
+            if body is not None:
+                compressed = compress_cached_page(key, body, encoding, page_tags)
+                if compressed is not None:
+                    return cached_page_response(compressed, "HIT", encoding)
+                return cached_page_response(body, "HIT")
+
+            status, body, headers = await handler(request, **kwargs)
+            if status == 200:
+                response_cache.set(key, body, tags=page_tags)
+                compressed = compress_cached_page(key, body, encoding, page_tags)
+                if compressed is not None:
+                    return cached_page_response(compressed, "MISS", encoding)
+            return status, body, headers + [("x-cache", "MISS")]
+
+        return wrapper
+
+    return decorator
+
+
+def cached_page_response(body, cache_status, encoding=None):
+    headers = [("content-type", "text/html; charset=utf-8"), ("x-cache", cache_status)]
+    if encoding:
+        headers.append(("content-encoding", encoding))
+    return 200, body, headers
+
+
+def compress_response(request, status, body, headers):
+    """Counterpart of app.compress_response for native responses, which are never streamed"""
+    mimetype = dict(headers).get("content-type", "").split(";")[0]
+    if not is_compressible(mimetype):
+        return body, headers
+    headers = headers + [("vary", "Accept-Encoding")]
+    encoding = negotiated_encoding(request.headers.get("accept-encoding"))
+    if (
+        encoding is None
+        or status in (204, 304)
+        or any(name == "content-encoding" for name, _ in headers)
+        or len(body) < app.config["COMPRESS_MIN_SIZE"]
+    ):
+        return body, headers
+    return compress(body, encoding, app.config["COMPRESS_LEVELS"][encoding]), headers + [("content-encoding", encoding)]
+
+
+# Native Handlers
+
+
+@cached_page(TAG_USER_LIST)
+@db_heavy
+async def index(request):
+    sort = request.args.get("sort", DEFAULT_USER_SORT)
+    if sort not in USER_SORTS:
+        sort = DEFAULT_USER_SORT
+    per_page = clamp_per_page(request)
+
+    statement, window = keyset_window(
+        db.select(*projected_columns(USER_LIST_FIELDS)),
+        sort,
+        request.args.get("after"),
+        request.args.get("before"),
+        per_page,
+    )
+    async with AsyncSession(async_engine) as session:
+        page = keyset_page(list(await session.execute(statement)), window)
+        total = await session.scalar(db.select(db.func.count(User.id)))
+
+    return html_response(
+        render_page(
+            request,
+            "index.html",
+            users=page.items,
+            page=page,
+            total=total,
+            sort=sort,
+            sorts=USER_SORTS,
+            per_page=per_page,
+        )
+    )
+
+
+@cached_page(user_tag)
+async def view_user(request, user_id):
+    async with AsyncSession(async_engine) as session:
+        user = await session.get(User, user_id)
+    if user is None:
+        return html_response(render_page(request, "404.html"), 404)
+    return html_response(render_page(request, "view.html", user=user))
+
+
+@cached_page(TAG_USER_SEARCH)
+@db_heavy
+async def search_users(request):
+    query = request.args.get("query", "")
+    limit = app.config["SEARCH_RESULT_LIMIT"]
+    users = []
+    if query:
+        # The FTS-or-LIKE choice reads the (cached) index check on the app's engine
+        with app.app_context():
+            statement = search_users_statement(query, limit, projected_columns(USER_LIST_FIELDS))
+        async with AsyncSession(async_engine) as session:
+            users = (await session.execute(statement)).all()
+    return html_response(render_page(request, "search.html", users=users, query=query, limit=limit))
+
+
+@db_heavy
+async def api_list_users(request):
+    fields = parse_api_fields(request.args.get("fields"))
+    if fields is None:
+        return api_error(f"Unknown field, choose from: {', '.join(API_FIELDS)}", 400)
+
+    sort = request.args.get("sort", DEFAULT_USER_SORT)
+    if sort not in USER_SORTS:
+        return api_error(f"Unknown sort, choose from: {', '.join(USER_SORTS)}", 400)
+
+    sort_column = USER_SORTS[sort][0]
+    statement, window = keyset_window(
+        db.select(*projected_columns(fields, "id", sort_column.key, "updated_at")),
+        sort,
+        request.args.get("after"),
+        request.args.get("before"),
+        clamp_per_page(request),
+    )
+    async with AsyncSession(async_engine) as session:
+        page = keyset_page(list(await session.execute(statement)), window)
+
+    etag = make_etag(fields, page.next_cursor, page.prev_cursor, [(row.id, row.updated_at) for row in page.items])
+    return conditional_json(
+        request,
+        lambda: {
+            "users": [serialize_user(row, fields) for row in page.items],
+            "next_cursor": page.next_cursor,
+            "prev_cursor": page.prev_cursor,
+        },
+        etag,
+    )
+
+
+async def api_get_user(request, user_id):
+    fields = parse_api_fields(request.args.get("fields"))
+    if fields is None:
+        return api_error(f"Unknown field, choose from: {', '.join(API_FIELDS)}", 400)
+
+    statement = db.select(*projected_columns(fields, "id", "updated_at")).where(User.id == user_id)
+    async with AsyncSession(async_engine) as session:
+        row = (await session.execute(statement)).first()
+    if row is None:
+        return api_error("User not found", 404)
+
+    etag = make_etag(fields, row.id, row.updated_at)
+    return conditional_json(request, lambda: serialize_user(row, fields), etag, row.updated_at)
+
+
+async def healthz(request):
+    return json_response({"status": "ok"})
+
+
+async def readyz(request):
+    async def ping():
+        async with async_engine.connect() as connection:
+            await connection.execute(db.text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), timeout=app.config["READINESS_TIMEOUT"])
+    except asyncio.TimeoutError:
+        return json_response({"status": "unavailable", "error": "database ping timed out"}, 503)
+    except Exception as e:
+        return json_response({"status": "unavailable", "error": str(e)}, 503)
+    return json_response({"status": "ok"})
+
+
+# (pattern, endpoint, handler, renders HTML); endpoints match the Flask view names used in metrics
+NATIVE_ROUTES = [
+    (re.compile(r"/"), "index", index, True),
+    (re.compile(r"/view/(?P<user_id>\d+)"), "view_user", view_user, True),
+    (re.compile(r"/search"), "search_users", search_users, True),
+    (re.compile(r"/api/users"), "api_list_users", api_list_users, False),
+    (re.compile(r"/api/users/(?P<user_id>\d+)"), "api_get_user", api_get_user, False),
+    (re.compile(r"/healthz"), "healthz", healthz, False),
+    (re.compile(r"/readyz"), "readyz", readyz, False),
+]
+
+
+def resolve(request):
+    """Return (endpoint, handler, kwargs) for a natively served request, or None to use the Flask app"""
+    if request.method != "GET":
+        return None
+    for pattern, endpoint, handler, renders_html in NATIVE_ROUTES:
+        match = pattern.fullmatch(request.path)
+        if match is None:
+            continue
+        # Pages for a visitor with a session may show their flash messages, which Flask consumes
+        if renders_html and app.config["SESSION_COOKIE_NAME"] in request.cookies:
+            return None
+        kwargs = {name: int(value) for name, value in match.groupdict().items()}
+        # Ids too large for SQLite are left to the Flask app, which answers them with its usual 404
+        if not all(is_row_id(value) for value in kwargs.values()):
+            return None
+        return endpoint, handler, kwargs
+    return None
+
+
+# ASGI Application
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Look up the search index once, so no request has to
+            with app.app_context():
+                search_index_available()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    request = Request(scope) if scope["type"] == "http" else None
+    route = resolve(request) if request else None
+    if route is None:
+        return await wsgi_application(scope, receive, send)
+
+    endpoint, handler, kwargs = route
+    started = time.perf_counter()
+    stats = {"endpoint": endpoint, "queries": 0}
+    token = request_stats.set(stats)
+    rejection = await call_admission(check_rate_limit, endpoint, (scope.get("client") or ("",))[0])
+    try:
+        if rejection is not None:
+            status, body, headers = rejected_response(request, *rejection)
+        else:
+            with app.app_context():
+                status, body, headers = await handler(request, **kwargs)
+    except Exception:
+        app.logger.exception("Error in %s", endpoint)
+        if request.path.startswith("/api/"):
+            status, body, headers = api_error("Internal server error", 500)
+        else:
+            status, body, headers = html_response(render_page(request, "500.html"), 500)
+    finally:
+        request_stats.reset(token)
+    with app.app_context():
+        body, headers = compress_response(request, status, body, headers)
+
+    labels = {"endpoint": endpoint}
+    metrics.observe(REQUEST_LATENCY, time.perf_counter() - started, labels)
+    metrics.observe(QUERIES_PER_REQUEST, stats["queries"], labels)
+    metrics.inc(REQUESTS, dict(labels, method=request.method, status=str(status)))
+    metrics.maybe_flush()
+
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+    headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
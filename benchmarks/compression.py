@@ -0,0 +1,109 @@
+"""
+Measure what compression and the Jinja bytecode cache save on the HTML pages
+
+For the list and search pages of a seeded database, reports the bytes sent
+uncompressed, gzipped and (if installed) brotli-compressed, and the CPU per
+request for a cache miss, a cache hit and a hit on the cached compressed copy.
+Then times how long a fresh process takes to load every template, compiling
+them from source and loading them from a warm bytecode cache.
+
+Usage:
+    python benchmarks/compression.py --users 100000 --repeat 50
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test import ROOT, seeded_database
+
+PAGES = {
+    "index": "/",
+    "index 500": "/?per_page=500",
+    "search": "/search?query=ali",
+}
+TEMPLATE_LOAD = (
+    "import time; from app import create_app, precompile_templates; app = create_app(); "
+    "started = time.process_time(); precompile_templates(app); print(time.process_time() - started)"
+)
+
+
+def cpu_ms(client, path, headers, repeat, clear_cache):
+    response_cache = client.application.extensions["response_cache"]
+
+    timings = []
+    for _ in range(repeat):
+        if clear_cache:
+            response_cache.clear()
+        started = time.process_time()
+        client.get(path, headers=headers)
+        timings.append((time.process_time() - started) * 1000)
+    return statistics.median(timings)
+
+
+def measure_pages(repeat):
+    from app import app
+    from compression import ENCODINGS
+
+    client = app.test_client()
+    results = {}
+    for name, path in PAGES.items():
+        result = {"bytes": {"identity": len(client.get(path).data)}}
+        for encoding in ENCODINGS:
+            result["bytes"][encoding] = len(client.get(path, headers={"Accept-Encoding": encoding}).data)
+        best = {"Accept-Encoding": ENCODINGS[0]}
+        result["cpu_ms"] = {
+            "miss": cpu_ms(client, path, {}, repeat, clear_cache=True),
+            f"miss {ENCODINGS[0]}": cpu_ms(client, path, best, repeat, clear_cache=True),
+            "hit": cpu_ms(client, path, {}, repeat, clear_cache=False),
+            f"hit {ENCODINGS[0]}": cpu_ms(client, path, best, repeat, clear_cache=False),
+        }
+        results[name] = result
+    return results
+
+
+def template_load_ms(bytecode_cache, runs=5):
+    """Median CPU time a fresh process spends loading every template"""
+    env = dict(os.environ, JINJA_BYTECODE_CACHE=bytecode_cache)
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TEMPLATE_LOAD], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+        )
+        timings.append(float(output.stdout.split()[-1]) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response compression and the Jinja bytecode cache")
+    parser.add_argument("--users", type=int, default=100000, help="Dataset size")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed requests per measurement")
+    args = parser.parse_args()
+
+    database = seeded_database(args.users)
+    # The engine is created when app is imported, so point it at the dataset first
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database}"
+    os.environ["CACHE_BACKEND"] = "memory"
+    sys.path.insert(0, str(ROOT))
+
+    for name, result in measure_pages(args.repeat).items():
+        sizes = ", ".join(f"{encoding} {size / 1024:.1f} KB" for encoding, size in result["bytes"].items())
+        timings = ", ".join(f"{case} {ms:.2f}" for case, ms in result["cpu_ms"].items())
+        print(f"{name:<10} {sizes}")
+        print(f"{'':<10} CPU ms per request: {timings}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compiled = template_load_ms("none")
+        template_load_ms(cache_dir, runs=1)  # fill the cache
+        cached = template_load_ms(cache_dir)
+    print(f"\nLoading every template in a new process: {compiled:.1f} ms compiled, {cached:.1f} ms from bytecode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare full ORM objects with column projections for the list pages
+
+Loads the same rows from a seeded database either as User instances (what
+index() and search_users() used to do) or as plain rows of the displayed
+columns (what they do now), optionally rendering index.html from them, and
+reports CPU time and peak Python memory per 10k rows.
+
+Usage:
+    python benchmarks/list_projection.py --users 100000 --rows 10000
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test import seeded_database
+
+
+def load_rows(db, User, mode, rows):
+    """Fetch ``rows`` users as ORM objects ("orm") or as projected rows ("rows")"""
+    from app import USER_LIST_FIELDS, projected_columns
+
+    columns = [User] if mode == "orm" else projected_columns(USER_LIST_FIELDS)
+    result = db.session.execute(db.select(*columns).order_by(User.id).limit(rows))
+    return result.scalars().all() if mode == "orm" else result.all()
+
+
+def measure(mode, rows, repeat, render):
+    """Return (median CPU ms, peak MB) for loading (and optionally rendering) ``rows`` users"""
+    from app import app, db, User
+    from flask import render_template
+
+    def run():
+        users = load_rows(db, User, mode, rows)
+        if render:
+            render_template("index.html", users=users, page=None, total=rows, sort="id", sorts={}, per_page=rows)
+        db.session.remove()
+
+    with app.test_request_context("/"):
+        run()
+        timings = []
+        for _ in range(repeat):
+            gc.collect()
+            started = time.process_time()
+            run()
+            timings.append((time.process_time() - started) * 1000)
+
+        gc.collect()
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return statistics.median(timings), peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ORM objects against column projections for list pages")
+    parser.add_argument("--users", type=int, default=100000, help="Dataset size")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows loaded per measurement")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed repetitions per mode")
+    args = parser.parse_args()
+
+    database = seeded_database(max(args.users, args.rows))
+    # The engine is created when app is imported, so point it at the dataset first
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database}"
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+
+    scale = 10000 / args.rows
+    print(f"{args.rows} rows, per 10k rows:")
+    print(f"{'step':<14} {'mode':<6} {'CPU ms':>8} {'peak MB':>8}")
+    for render in (False, True):
+        results = {mode: measure(mode, args.rows, args.repeat, render) for mode in ("orm", "rows")}
+        step = "load + render" if render else "load"
+        for mode, (cpu_ms, peak_mb) in results.items():
+            print(f"{step:<14} {mode:<6} {cpu_ms * scale:>8.1f} {peak_mb * scale:>8.1f}")
+        (orm_ms, orm_mb), (rows_ms, rows_mb) = results["orm"], results["rows"]
+        print(f"{'':<14} {'saved':<6} {100 * (1 - rows_ms / orm_ms):>7.0f}% {100 * (1 - rows_mb / orm_mb):>7.0f}%")
+
+
+if __name__ == "__main__":
+    main()
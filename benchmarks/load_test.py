@@ -0,0 +1,299 @@
+"""
+Reproducible load test for every route of the Flask CRUD application
+
+Seeds (or reuses) a database of N users, starts gunicorn with the same
+gunicorn.conf.py that scripts/entrypoint.sh uses, drives each route with a
+pool of concurrent HTTP clients and reports p50/p95/p99 latency and
+requests/second. Results are written as JSON and, when a baseline is given,
+compared against it so regressions fail the run.
+
+Usage:
+    python benchmarks/load_test.py --users 100000 --requests 1000 --concurrency 16
+    python benchmarks/load_test.py --users 1000 --save-baseline benchmarks/results/baseline.json
+    python benchmarks/load_test.py --users 1000 --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+ROOT = Path(__file__).parent.parent
+DATA_DIR = ROOT / "benchmarks" / "data"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Writes run after reads, and delete runs last so it does not empty the pages the others use
+ROUTES = ["index", "search", "suggest", "view", "api", "add", "update", "delete"]
+SEARCH_TERMS = ["ali", "kha", "lahore", "kar", "sana malik", "isl", "mirza", "quetta"]
+CITIES = ["Lahore", "Karachi", "Islamabad", "Multan"]
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+def build_request(route, i, users, rng, run_id):
+    """Return (method, path, body, headers) for the i-th request to ``route``"""
+    if route == "index":
+        return "GET", "/" if i % 2 else "/?sort=newest", None, {}
+    if route == "search":
+        return "GET", "/search?" + urlencode({"query": rng.choice(SEARCH_TERMS)}), None, {}
+    if route == "suggest":
+        term = rng.choice(SEARCH_TERMS)
+        return "GET", "/search/suggest?" + urlencode({"q": term[: rng.randint(1, len(term))]}), None, {}
+    if route == "view":
+        return "GET", f"/view/{rng.randint(1, users)}", None, {}
+    if route == "api":
+        return "GET", f"/api/users/{rng.randint(1, users)}", None, {}
+    if route == "add":
+        form = {"first_name": "Load", "last_name": "Test", "email": f"load{run_id}-{i}@bench.test", "age": 30}
+        return "POST", "/add", urlencode(dict(form, city=rng.choice(CITIES))), FORM_HEADERS
+    if route == "update":
+        user_id = rng.randint(1, users)
+        form = {"first_name": "Updated", "last_name": "User", "email": f"user{user_id - 1}@bench.test", "age": 40}
+        return "POST", f"/update/{user_id}", urlencode(dict(form, city=rng.choice(CITIES))), FORM_HEADERS
+    if route == "delete":
+        # Every delete removes a different seeded user, from the highest id down
+        return "GET", f"/delete/{users - i}", None, {}
+    raise ValueError(f"Unknown route: {route}")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_route(base_url, route, requests, concurrency, users, run_id):
+    """Send ``requests`` requests to one route from ``concurrency`` threads and summarize latency"""
+    target = urlsplit(base_url)
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(worker_id):
+        rng = random.Random(f"{route}-{worker_id}")
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=130)
+        while (i := next(counter)) < requests:
+            method, path, body, headers = build_request(route, i, users, rng, run_id)
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(worker_id,)) for worker_id in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "rps": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def seeded_database(users):
+    """Return the path of a cached database with ``users`` rows, seeding it on first use"""
+    path = DATA_DIR / f"users-{users}.db"
+    if not path.exists():
+        print(f"Seeding {users} users (cached in {path})...")
+        subprocess.run(
+            [sys.executable, str(ROOT / "benchmarks" / "seed_users.py"), "--users", str(users), "--output", str(path)],
+            check=True,
+        )
+    return path
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    """Poll /readyz until the server answers or the timeout expires"""
+    target = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            connection = http.client.HTTPConnection(target.hostname, target.port, timeout=2)
+            connection.request("GET", "/readyz")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready in time")
+
+
+def server_command(mode, port):
+    """Command line for the sync (gunicorn) or async (uvicorn) deployment, as scripts/entrypoint.sh runs them"""
+    if mode == "async":
+        workers = runpy.run_path(str(ROOT / "gunicorn.conf.py"))["workers"]
+        concurrency = os.getenv("ASGI_MAX_CONCURRENCY", "1000")
+        host = ["--host", "127.0.0.1", "--port", str(port)]
+        limits = ["--workers", str(workers), "--limit-concurrency", concurrency, "--log-level", "warning"]
+        return ["uvicorn", "asgi:application", *host, *limits]
+    return ["gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}", "--log-level", "warning", "app:app"]
+
+
+def start_server(database, workdir, port, cache_backend, extra_env=None, mode="sync"):
+    """Start the app (gunicorn, or uvicorn in async mode) on a private port against ``database``"""
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{database}",
+        SECRET_KEY="benchmark-secret-key",
+        CACHE_BACKEND=cache_backend,
+        CACHE_PATH=str(Path(workdir) / "cache.db"),
+        METRICS_DIR=str(Path(workdir) / "metrics"),
+        # Every benchmark client comes from 127.0.0.1, so rate limits would throttle the measurement itself
+        ADMISSION_BACKEND="none",
+    )
+    env.update(extra_env or {})
+    process = subprocess.Popen(server_command(mode, port), cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, process)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process, base_url
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against ``baseline``"""
+    regressions = []
+    for route, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {previous['rps']} -> {current['rps']} req/s")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{route}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'route':<8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in results["routes"].items():
+        print(
+            f"{route:<8} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9} "
+            f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test every route and compare against a baseline")
+    parser.add_argument("--users", type=int, default=1000, help="Dataset size, e.g. 1000, 100000 or 1000000")
+    parser.add_argument("--requests", type=int, default=500, help="Requests sent to each route")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client connections")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma-separated subset of routes")
+    parser.add_argument("--mode", default="sync", choices=["sync", "async"], help="gunicorn (sync) or uvicorn (async)")
+    parser.add_argument("--cache", default="sqlite", choices=["memory", "sqlite", "none"], help="Page cache backend")
+    parser.add_argument("--port", type=int, default=8091, help="Port for the benchmark server")
+    parser.add_argument("--server-url", help="Benchmark an already running server instead of starting gunicorn")
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; regressions exit with status 1")
+    parser.add_argument("--save-baseline", help="Also write the results to this path as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    routes = [route for route in args.routes.split(",") if route]
+    run_id = int(time.time())
+    gunicorn_config = {
+        key: value
+        for key, value in runpy.run_path(str(ROOT / "gunicorn.conf.py")).items()
+        if key in ("workers", "worker_class", "timeout", "threads", "preload_app")
+    }
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "users": args.users,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "mode": args.mode,
+            "cache": args.cache,
+            "gunicorn": gunicorn_config,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "routes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        base_url = args.server_url
+        if not base_url:
+            # Work on a copy so the deletes and adds never touch the cached seed
+            database = Path(workdir) / "bench.db"
+            shutil.copyfile(seeded_database(args.users), database)
+            process, base_url = start_server(database, workdir, args.port, args.cache, mode=args.mode)
+
+        try:
+            for route in routes:
+                print(f"Running {route}...")
+                results["routes"][route] = run_route(
+                    base_url, route, args.requests, args.concurrency, args.users, run_id
+                )
+        finally:
+            if process:
+                process.terminate()
+                process.wait()
+
+    print_table(results)
+
+    output = Path(args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2))
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Measure how a well-behaved client fares while another client floods the server
+
+Starts gunicorn the way scripts/entrypoint.sh does, with admission control
+off and then on, and runs two clients at once for a fixed time:
+
+    flood    many connections from 127.0.0.1 sending searches back to back
+    polite   a few requests per second from 127.0.0.2 to the list and user pages
+
+and reports the polite client's latency percentiles and errors, plus how
+many of the flood's requests were answered, refused (429/503) or failed.
+
+Usage:
+    python benchmarks/overload.py --users 100000 --seconds 20 --flood 32
+"""
+
+import argparse
+import http.client
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test import SEARCH_TERMS, percentile, seeded_database, start_server
+
+POLITE_ADDRESS = "127.0.0.2"
+
+
+def flood(port, deadline, statuses, lock):
+    rng = random.Random()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=130)
+    while time.perf_counter() < deadline:
+        # A fresh term each time, so the page cache cannot absorb the flood
+        query = rng.choice(SEARCH_TERMS)[: rng.randint(2, 4)] + rng.choice("aeiou")
+        try:
+            connection.request("GET", "/search?" + urlencode({"query": query}))
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            status = "error"
+        with lock:
+            statuses[status] += 1
+    connection.close()
+
+
+def polite(port, deadline, users, rate, latencies, errors):
+    rng = random.Random(7)
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=130, source_address=(POLITE_ADDRESS, 0))
+    while time.perf_counter() < deadline:
+        path = rng.choice(["/", f"/view/{rng.randint(1, users)}", f"/api/users/{rng.randint(1, users)}"])
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            ok = False
+        elapsed = time.perf_counter() - started
+        (latencies if ok else errors).append(elapsed)
+        time.sleep(max(0.0, 1 / rate - elapsed))
+    connection.close()
+
+
+def run(admission, database, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        extra_env = {
+            "ADMISSION_BACKEND": admission,
+            "ADMISSION_PATH": str(Path(workdir) / "admission.db"),
+            "DB_CONCURRENCY_LIMIT": str(args.db_limit),
+        }
+        process, _ = start_server(database, workdir, args.port, "none", extra_env=extra_env)
+        try:
+            statuses, lock, latencies, errors = Counter(), threading.Lock(), [], []
+            deadline = time.perf_counter() + args.seconds
+            threads = [
+                threading.Thread(target=flood, args=(args.port, deadline, statuses, lock)) for _ in range(args.flood)
+            ]
+            threads.append(
+                threading.Thread(target=polite, args=(args.port, deadline, args.users, 5, latencies, errors))
+            )
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            process.terminate()
+            process.wait()
+
+    latencies.sort()
+    return {
+        "polite_requests": len(latencies) + len(errors),
+        "polite_errors": len(errors),
+        "polite_p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "polite_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "polite_max_ms": round((latencies[-1] if latencies else 0) * 1000, 1),
+        "flood": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a polite client's latency while another floods the server")
+    parser.add_argument("--users", type=int, default=100000, help="Dataset size")
+    parser.add_argument("--seconds", type=float, default=20, help="How long each run lasts")
+    parser.add_argument("--flood", type=int, default=32, help="Connections the flooding client uses")
+    parser.add_argument("--db-limit", type=int, default=3, help="DB_CONCURRENCY_LIMIT for the run with admission")
+    parser.add_argument("--port", type=int, default=8094, help="Port for the benchmark server")
+    args = parser.parse_args()
+
+    database = seeded_database(args.users)
+    for admission in ("none", "sqlite"):
+        result = run(admission, database, args)
+        print(
+            f"admission={admission:<7} polite: {result['polite_requests']} requests, "
+            f"{result['polite_errors']} errors, p50 {result['polite_p50_ms']} ms, "
+            f"p99 {result['polite_p99_ms']} ms, max {result['polite_max_ms']} ms; flood: {result['flood']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Seed a benchmark database with N deterministic users
+Uses the app's bulk import path so the schema, search index and triggers
+are exactly what production runs with.
+
+Usage:
+    python benchmarks/seed_users.py --users 100000 --output benchmarks/data/users-100000.db
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+FIRST_NAMES = ["Ali", "Ayesha", "Hassan", "Fatima", "Usman", "Zainab", "Bilal", "Sana", "Hamza", "Maryam"]
+LAST_NAMES = ["Khan", "Ahmed", "Malik", "Raza", "Butt", "Sheikh", "Qureshi", "Chaudhry", "Mirza", "Siddiqui"]
+CITIES = ["Lahore", "Karachi", "Islamabad", "Rawalpindi", "Peshawar", "Quetta", "Multan", "Faisalabad"]
+
+
+def generate_users(count, seed=42):
+    """Yield (line number, row) pairs for ``count`` reproducible users"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield i + 1, {
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "email": f"user{i}@bench.test",
+            "age": rng.randint(18, 80),
+            "city": rng.choice(CITIES),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a SQLite database filled with benchmark users")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users to create")
+    parser.add_argument("--output", required=True, help="SQLite file to create (replaced if it exists)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(output + suffix):
+            os.remove(output + suffix)
+
+    # The engine is created when app is imported, so point it at the output file first
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{output}"
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app import app, create_tables, import_users
+
+    create_tables()
+    started = time.perf_counter()
+    with app.app_context():
+        summary = import_users(generate_users(args.users, args.seed), chunk_size=5000)
+    elapsed = time.perf_counter() - started
+
+    print(f"Seeded {summary['inserted']} users into {output} in {elapsed:.1f}s")
+    if summary["failed"]:
+        print(f"❌ {summary['failed']} rows failed: {summary['errors'][:5]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare the sync (gunicorn) and async (uvicorn + async engine) deployments
+
+Both modes are started in turn on a fresh copy of the same seeded database,
+with the same number of worker processes, and driven with the same request
+mix from benchmarks/load_test.py. The page cache is off by default so the
+numbers reflect database access rather than cache hits.
+
+Usage:
+    python benchmarks/serving_modes.py --users 100000 --requests 2000 --concurrency 64
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test import RESULTS_DIR, run_route, seeded_database, start_server
+
+READ_ROUTES = ["index", "search", "view", "api"]
+
+
+def benchmark_mode(mode, users, routes, requests, concurrency, cache, port):
+    """Run every route against one deployment mode and return {route: stats}"""
+    with tempfile.TemporaryDirectory() as workdir:
+        database = Path(workdir) / "bench.db"
+        shutil.copyfile(seeded_database(users), database)
+        process, base_url = start_server(database, workdir, port, cache, mode=mode)
+        try:
+            run_id = int(time.time())
+            return {route: run_route(base_url, route, requests, concurrency, users, run_id) for route in routes}
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async serving modes on the same dataset")
+    parser.add_argument("--users", type=int, default=100000, help="Dataset size")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests sent to each route")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent client connections")
+    parser.add_argument("--routes", default=",".join(READ_ROUTES), help="Comma-separated routes to drive")
+    parser.add_argument("--cache", default="none", choices=["memory", "sqlite", "none"], help="Page cache backend")
+    parser.add_argument("--port", type=int, default=8092, help="Port for the benchmark servers")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    routes = [route for route in args.routes.split(",") if route]
+    results = {}
+    for mode in ("sync", "async"):
+        print(f"Benchmarking {mode} mode...")
+        results[mode] = benchmark_mode(mode, args.users, routes, args.requests, args.concurrency, args.cache, args.port)
+
+    print(f"\n{args.users} users, {args.concurrency} concurrent clients, cache={args.cache}")
+    print(f"{'route':<8} {'sync req/s':>11} {'async req/s':>12} {'sync p95':>9} {'async p95':>10} {'errors':>7}")
+    for route in routes:
+        sync, async_ = results["sync"][route], results["async"][route]
+        print(
+            f"{route:<8} {sync['rps']:>11} {async_['rps']:>12} {sync['p95_ms']:>9} {async_['p95_ms']:>10} "
+            f"{sync['errors'] + async_['errors']:>7}"
+        )
+
+    output = Path(args.output or RESULTS_DIR / f"serving-modes-{args.users}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps({"users": args.users, "concurrency": args.concurrency, "cache": args.cache, **results}, indent=2)
+    )
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark concurrent write throughput against SQLite
+Compares SQLite's default settings with the tuned pragmas from app.py
+
+Each worker process mimics a sync gunicorn worker handling /add: it opens a
+connection and commits one INSERT per request. The default configuration
+keeps SQLite's rollback journal with no busy timeout, so concurrent writers fail
+with "database is locked"; the tuned one uses WAL, synchronous=NORMAL and a
+busy timeout.
+
+Usage:
+    python benchmarks/sqlite_writes.py --workers 4 --writes 500
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app, apply_sqlite_pragmas
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS user (
+    id INTEGER PRIMARY KEY,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50) NOT NULL,
+    email VARCHAR(120) NOT NULL UNIQUE,
+    age INTEGER NOT NULL,
+    city VARCHAR(50) NOT NULL,
+    created_at DATETIME
+)"""
+
+
+def writer(path, pragmas, worker_id, writes, results):
+    """Insert ``writes`` rows, one transaction each, and report successes and lock errors"""
+    # timeout=0 disables Python's own retry loop so only busy_timeout applies
+    connection = sqlite3.connect(path, timeout=0)
+    ok = locked = 0
+    try:
+        apply_sqlite_pragmas(connection, pragmas)
+        for i in range(writes):
+            try:
+                connection.execute(
+                    "INSERT INTO user (first_name, last_name, email, age, city, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, datetime('now'))",
+                    ("Bench", "User", f"w{worker_id}-{i}@bench.test", 30, "Lahore"),
+                )
+                connection.commit()
+                ok += 1
+            except sqlite3.OperationalError:
+                connection.rollback()
+                locked += 1
+    finally:
+        connection.close()
+        results.put((ok, locked))
+
+
+def run(label, pragmas, workers, writes):
+    """Run one configuration on a fresh database file and return its results"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup = sqlite3.connect(path)
+        apply_sqlite_pragmas(setup, pragmas)
+        setup.execute(SCHEMA)
+        setup.commit()
+        setup.close()
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=writer, args=(path, pragmas, worker_id, writes, results))
+            for worker_id in range(workers)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+    ok = sum(result[0] for result in totals)
+    locked = sum(result[1] for result in totals)
+    print(f"{label:<10} {ok:>8} {locked:>8} {elapsed:>9.2f}s {ok / elapsed:>12.0f}")
+    return ok / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite write throughput with and without tuning")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent writer processes (gunicorn workers)")
+    parser.add_argument("--writes", type=int, default=500, help="Committed inserts per worker")
+    args = parser.parse_args()
+
+    # SQLite defaults: rollback journal, synchronous=FULL, no busy timeout
+    default_pragmas = {}
+    tuned_pragmas = app.config["SQLITE_PRAGMAS"]
+
+    print(f"{args.workers} workers x {args.writes} single-row transactions")
+    print(f"{'config':<10} {'written':>8} {'locked':>8} {'elapsed':>10} {'writes/sec':>12}")
+    baseline = run("default", default_pragmas, args.workers, args.writes)
+    tuned = run("tuned", tuned_pragmas, args.workers, args.writes)
+    print(f"\nSpeedup: {tuned / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Measure cold start and per-worker memory of the sync (gunicorn) deployment
+
+Starts the server the way scripts/entrypoint.sh does in two setups on a copy
+of the same seeded database:
+
+    legacy   schema init in a separate ``python -c``, every worker imports the app
+    preload  ``flask init-db``, the master imports the app and forks the workers
+
+and reports the time until every worker is up and answering, plus each
+worker's RSS, PSS (shared pages split between the processes sharing them) and
+USS (pages only that worker holds), at boot and after some traffic. Linux only.
+
+Usage:
+    python benchmarks/startup.py --users 100000 --workers 4 --requests 500
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test import RESULTS_DIR, ROOT, run_route, seeded_database, wait_until_ready
+
+INIT_COMMANDS = {
+    "legacy": [sys.executable, "-c", "from app import create_tables; create_tables()"],
+    "preload": [sys.executable, "-m", "flask", "--app", "app", "init-db"],
+}
+TRAFFIC_ROUTES = ["index", "search", "view", "api"]
+
+
+def memory_kb(pid):
+    """Return {rss, pss, uss} in KiB for one process, from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as handle:
+        return [int(pid) for pid in handle.read().split()]
+
+
+def average_memory_mb(pids):
+    samples = [memory_kb(pid) for pid in pids]
+    return {key: round(sum(sample[key] for sample in samples) / len(samples) / 1024, 1) for key in samples[0]}
+
+
+def boot(mode, database, workdir, port, workers):
+    """Initialize the schema and start gunicorn; return (process, base_url, timings)"""
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{database}",
+        SECRET_KEY="benchmark-secret-key",
+        CACHE_BACKEND="none",
+        ADMISSION_BACKEND="none",
+        METRICS_DIR=str(Path(workdir) / "metrics"),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_PRELOAD="1" if mode == "preload" else "0",
+    )
+    started = time.perf_counter()
+    subprocess.run(INIT_COMMANDS[mode], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    initialized = time.perf_counter()
+
+    # Run gunicorn from this interpreter, so process.pid is the master and not a launcher script
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}"]
+    process = subprocess.Popen(command + ["--log-level", "warning", "app:app"], cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, process)
+        # Ready means one worker answers; wait for the rest so the timing covers them all
+        while len(worker_pids(process.pid)) < workers:
+            if process.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.05)
+    except RuntimeError:
+        process.terminate()
+        raise
+    ready = time.perf_counter()
+    return process, base_url, {"init_s": round(initialized - started, 2), "total_s": round(ready - started, 2)}
+
+
+def benchmark_mode(mode, users, workers, requests, port):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = Path(workdir) / "bench.db"
+        shutil.copyfile(seeded_database(users), database)
+        process, base_url, result = boot(mode, database, workdir, port, workers)
+        try:
+            pids = worker_pids(process.pid)
+            result["boot_mb"] = average_memory_mb(pids)
+            run_id = int(time.time())
+            for route in TRAFFIC_ROUTES:
+                run_route(base_url, route, requests, workers * 2, users, run_id)
+            result["after_traffic_mb"] = average_memory_mb(pids)
+            result["master_mb"] = memory_kb(process.pid)["rss"] // 1024
+            return result
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure gunicorn cold start and per-worker memory")
+    parser.add_argument("--users", type=int, default=100000, help="Dataset size")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--requests", type=int, default=500, help="Requests sent to each route after boot")
+    parser.add_argument("--port", type=int, default=8093, help="Port for the benchmark servers")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("legacy", "preload"):
+        print(f"Starting {mode}...")
+        results[mode] = benchmark_mode(mode, args.users, args.workers, args.requests, args.port)
+
+    print(f"\n{args.workers} workers, {args.users} users; memory is the per-worker average in MB")
+    print(
+        f"{'mode':<8} {'init s':>7} {'ready s':>8} {'RSS':>6} {'PSS':>6} {'USS':>6}"
+        f" {'RSS*':>6} {'PSS*':>6} {'USS*':>6}"
+    )
+    for mode, result in results.items():
+        boot_mb, after_mb = result["boot_mb"], result["after_traffic_mb"]
+        print(
+            f"{mode:<8} {result['init_s']:>7} {result['total_s']:>8} "
+            f"{boot_mb['rss']:>6} {boot_mb['pss']:>6} {boot_mb['uss']:>6} "
+            f"{after_mb['rss']:>6} {after_mb['pss']:>6} {after_mb['uss']:>6}"
+        )
+    print("(* after traffic)")
+
+    output = Path(args.output or RESULTS_DIR / f"startup-{args.workers}w.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"users": args.users, "workers": args.workers, **results}, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
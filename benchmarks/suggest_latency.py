@@ -0,0 +1,110 @@
+"""
+Measure /search/suggest latency per keystroke on a large dataset
+
+Seeds (or reuses) a database of N users whose names and cities are drawn from
+pools of thousands of distinct values, then replays typing: every prefix of
+sampled names and cities is requested in turn through the Flask test client,
+so the numbers are the server-side cost of one keystroke.
+
+Usage:
+    python benchmarks/suggest_latency.py --users 1000000
+    python benchmarks/suggest_latency.py --users 1000000 --words 500 --output results/suggest.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test import DATA_DIR, RESULTS_DIR, percentile
+
+SYLLABLES = ["al", "ay", "ba", "da", "fa", "ha", "ja", "ka", "la", "ma", "na", "qa", "ra", "sa", "ta", "za", "ri", "mi"]
+
+
+def name_pool(count, rng):
+    """Return ``count`` distinct capitalised pseudo-names"""
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+    return sorted(names)
+
+
+def generate_users(count, pools, seed=42):
+    """Yield (line number, row) pairs drawing names and cities from ``pools``"""
+    rng = random.Random(seed)
+    first_names, last_names, cities = pools
+    for i in range(count):
+        yield i + 1, {
+            "first_name": rng.choice(first_names),
+            "last_name": rng.choice(last_names),
+            "email": f"user{i}@suggest.test",
+            "age": rng.randint(18, 80),
+            "city": rng.choice(cities),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search-as-you-type suggestions")
+    parser.add_argument("--users", type=int, default=1000000, help="Dataset size")
+    parser.add_argument("--words", type=int, default=300, help="Names and cities to type out")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    parser.add_argument("--output", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pools = (name_pool(3000, rng), name_pool(5000, rng), name_pool(400, rng))
+    database = DATA_DIR / f"suggest-{args.users}.db"
+
+    # The engine is created when app is imported, so point it at the dataset first
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database}"
+    os.environ.setdefault("CACHE_BACKEND", "none")
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from app import app, create_tables, import_users
+
+    if not database.exists():
+        database.parent.mkdir(parents=True, exist_ok=True)
+        print(f"Seeding {args.users} users into {database}...")
+        create_tables()
+        started = time.perf_counter()
+        with app.app_context():
+            import_users(generate_users(args.users, pools, args.seed), chunk_size=5000)
+        print(f"   done in {time.perf_counter() - started:.0f}s")
+
+    words = [rng.choice(rng.choice(pools)) for _ in range(args.words)]
+    client = app.test_client()
+    client.get("/search/suggest?q=a")
+
+    timings = []
+    for word in words:
+        for end in range(1, len(word) + 1):
+            started = time.perf_counter()
+            response = client.get(f"/search/suggest?q={word[:end].lower()}")
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200
+
+    timings.sort()
+    result = {
+        "users": args.users,
+        "keystrokes": len(timings),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "max_ms": round(timings[-1], 2),
+    }
+    print(
+        f"{result['keystrokes']} keystrokes: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+        f"p99 {result['p99_ms']} ms, max {result['max_ms']} ms"
+    )
+
+    output = Path(args.output or RESULTS_DIR / f"suggest-{args.users}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark the ZAP report parser in scripts/zap-hook.py on a synthetic report
+
+Writes a ZAP-style XML report of the requested size, then parses it in a
+fresh process with the streaming parser (and optionally with a whole-document
+ET.parse for comparison) and reports wall time, throughput and peak RSS.
+
+Usage:
+    python benchmarks/zap_parse.py --size-mb 256
+    python benchmarks/zap_parse.py --size-mb 4096 --report /tmp/zap-4g.xml --keep
+    python benchmarks/zap_parse.py --size-mb 256 --compare-tree
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOK_PATH = Path(__file__).parent.parent / "scripts" / "zap-hook.py"
+
+PLUGINS = [
+    ("10038", "Content Security Policy (CSP) Header Not Set", "2", "Medium (High)"),
+    ("10020", "Missing Anti-clickjacking Header", "2", "Medium (Medium)"),
+    ("40012", "Cross Site Scripting (Reflected)", "3", "High (Medium)"),
+    ("40018", "SQL Injection", "3", "High (High)"),
+    ("10021", "X-Content-Type-Options Header Missing", "1", "Low (Medium)"),
+    ("10036", "Server Leaks Version Information", "1", "Low (High)"),
+    ("10096", "Timestamp Disclosure - Unix", "0", "Informational (Low)"),
+    ("10109", "Modern Web Application", "0", "Informational (Medium)"),
+]
+FILLER = "This paragraph pads the report like the real description, solution and reference fields do. " * 4
+
+
+def load_hook():
+    """Import scripts/zap-hook.py (its file name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location("zap_hook", HOOK_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_report(path, size_mb, instances_per_alert=20, seed=42):
+    """Write a synthetic ZAP XML report of roughly ``size_mb`` megabytes, return the alert count"""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    alerts = 0
+    with open(path, "w") as handle:
+        handle.write('<?xml version="1.0"?>\n<OWASPZAPReport programName="ZAP" version="2.14.0">\n')
+        handle.write('<site name="http://localhost:8080" host="localhost" port="8080" ssl="false">\n<alerts>\n')
+        while handle.tell() < target:
+            plugin_id, name, risk_code, risk_desc = rng.choice(PLUGINS)
+            instances = "".join(
+                f"<instance><uri>http://localhost:8080/view/{rng.randint(1, 5000)}</uri><method>GET</method>"
+                f"<param></param><attack></attack><evidence>{name}</evidence></instance>\n"
+                for _ in range(instances_per_alert)
+            )
+            handle.write(
+                f"<alertitem><pluginid>{plugin_id}</pluginid><alertRef>{plugin_id}</alertRef>"
+                f"<alert>{name}</alert><name>{name}</name><riskcode>{risk_code}</riskcode>"
+                f"<confidence>2</confidence><riskdesc>{risk_desc}</riskdesc><desc>{FILLER}</desc>\n"
+                f"<instances>\n{instances}</instances><count>{instances_per_alert}</count>"
+                f"<solution>{FILLER}</solution><reference>{FILLER}</reference></alertitem>\n"
+            )
+            alerts += 1
+        handle.write("</alerts>\n</site>\n</OWASPZAPReport>\n")
+    return alerts
+
+
+def parse_in_process(mode, path):
+    """Parse ``path`` in this process and print timing and peak memory as JSON"""
+    hook = load_hook()
+    started = time.perf_counter()
+    if mode == "stream":
+        summary = hook.parse_zap_xml(path)
+        alerts = summary["alerts"]
+    else:
+        # What zap-hook.py did before: build the whole tree, then walk it
+        root = hook.ET.parse(path).getroot()
+        alerts = dict.fromkeys(hook.RISK_LEVELS, 0)
+        for alert in root.findall(".//alertitem"):
+            risk = alert.findtext("riskdesc", "").split(" ", 1)[0]
+            if risk in alerts:
+                alerts[risk] += 1
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_kb / 1024, "alerts": alerts}))
+
+
+def run_parser(mode, path):
+    """Run one parser in a fresh interpreter so peak RSS is measured in isolation"""
+    output = subprocess.run(
+        [sys.executable, __file__, "--parse", mode, path], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ZAP XML report parsing")
+    parser.add_argument("--size-mb", type=int, default=256, help="Approximate size of the synthetic report")
+    parser.add_argument("--report", help="Where to write the report (default: a temporary file)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated report afterwards")
+    parser.add_argument("--compare-tree", action="store_true", help="Also time the old whole-document parse")
+    parser.add_argument("--parse", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.parse:
+        parse_in_process(*args.parse)
+        return
+
+    path = args.report or os.path.join(tempfile.gettempdir(), f"zap-bench-{args.size_mb}mb.xml")
+    print(f"Writing {args.size_mb} MB synthetic report to {path}...")
+    started = time.perf_counter()
+    alerts = write_report(path, args.size_mb)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"   {alerts} alert items, {size_mb:.0f} MB in {time.perf_counter() - started:.1f}s")
+
+    try:
+        modes = ["stream", "tree"] if args.compare_tree else ["stream"]
+        print(f"\n{'parser':<8} {'seconds':>9} {'MB/s':>8} {'peak RSS MB':>12}")
+        for mode in modes:
+            result = run_parser(mode, path)
+            print(
+                f"{mode:<8} {result['seconds']:>9.1f} {size_mb / result['seconds']:>8.1f} "
+                f"{result['peak_rss_mb']:>12.0f}"
+            )
+    finally:
+        if not args.keep:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
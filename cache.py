@@ -0,0 +1,252 @@
+"""
+Response/fragment cache backends for the Flask CRUD application
+
+Two interchangeable backends store byte strings under string keys, each
+entry with a TTL and a set of tags used for invalidation:
+
+- LRUCache: in-process, size-bounded LRU. Fastest, but every gunicorn
+  worker has its own copy, so invalidation only reaches one worker.
+- SQLiteCache: a small SQLite file shared by every worker on the host, so
+  an invalidation in one worker is seen by all of them.
+
+Both count hits, misses, evictions and invalidations for monitoring.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    """Per-process hit/miss counters shared by all backends"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class NullCache:
+    """Backend that never stores anything (caching disabled)"""
+
+    name = "none"
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        self.stats.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None, tags=()):
+        pass
+
+    def invalidate_tags(self, *tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def size(self):
+        return 0
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry TTL and tag invalidation"""
+
+    name = "memory"
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None, tags=()):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self.stats.sets += 1
+
+            # Evict least recently used entries beyond the size bound
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        """Drop an entry and its tag references (caller holds the lock)"""
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteCache:
+    """Cache stored in a local SQLite file, shared by every worker process on the host"""
+
+    name = "sqlite"
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS cache_entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires_at)",
+        """CREATE TABLE IF NOT EXISTS cache_tags (
+            tag TEXT NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (tag, key)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (key)",
+    ]
+
+    def __init__(self, path, max_entries=10000, default_ttl=60):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self):
+        """Return this thread's connection, reopening it after a fork"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = (
+            self._connect()
+            .execute("SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time()))
+            .fetchone()
+        )
+        if row is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return row[0]
+
+    def set(self, key, value, ttl=None, tags=()):
+        expires_at = time.time() + (ttl or self.default_ttl)
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)", [(t, key) for t in tags]
+            )
+
+            # Drop expired entries first, then the soonest-expiring ones beyond the size bound
+            evicted = connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            overflow = connection.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                evicted += connection.execute(
+                    "DELETE FROM cache_entries WHERE key IN "
+                    "(SELECT key FROM cache_entries ORDER BY expires_at LIMIT ?)",
+                    (overflow,),
+                ).rowcount
+            if evicted:
+                connection.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+            connection.execute("COMMIT")
+        self.stats.sets += 1
+        self.stats.evictions += evicted
+
+    def invalidate_tags(self, *tags):
+        if not tags:
+            return
+        placeholders = ", ".join("?" for _ in tags)
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            removed = connection.execute(
+                f"DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))",
+                tags,
+            ).rowcount
+            connection.execute(f"DELETE FROM cache_tags WHERE tag IN ({placeholders})", tags)
+            connection.execute("COMMIT")
+        self.stats.invalidations += removed
+
+    def clear(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM cache_entries")
+            connection.execute("DELETE FROM cache_tags")
+            connection.execute("COMMIT")
+
+    def size(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+def create_cache(backend, path=None, max_entries=1024, default_ttl=60):
+    """Build the cache backend named by ``backend`` ("memory", "sqlite" or "none")"""
+    if backend == "memory":
+        return LRUCache(max_entries=max_entries, default_ttl=default_ttl)
+    if backend == "sqlite":
+        return SQLiteCache(path, max_entries=max_entries, default_ttl=default_ttl)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,89 @@
+"""
+Response compression for the Flask CRUD application
+
+Shared by the Flask app and the ASGI entry point. Picks gzip or brotli from
+the client's Accept-Encoding and compresses either a whole body or a stream
+of chunks. Streams are flushed after every chunk, so a streamed export still
+reaches the client row batch by row batch instead of when it ends.
+
+Brotli is optional: without the ``brotli`` package only gzip is offered.
+"""
+
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first; best_match() keeps this order among equally weighted encodings
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Text formats worth compressing (images and archives are compressed already)
+COMPRESSIBLE_MIMETYPES = frozenset(
+    {
+        "text/html",
+        "text/css",
+        "text/csv",
+        "text/plain",
+        "text/javascript",
+        "application/javascript",
+        "application/json",
+        "application/x-ndjson",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+
+class GzipCompressor:
+    """zlib in gzip framing, with the process/flush/finish interface of brotli.Compressor"""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        # A sync flush ends on a byte boundary, so the client can decode everything sent so far
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def choose_encoding(accept_encoding):
+    """Return the best encoding the client accepts ("br" or "gzip"), or None to send the body as is"""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def new_compressor(encoding, level):
+    """``level`` is the gzip level (1-9) or the brotli quality (0-11)"""
+    if encoding == "br":
+        return brotli.Compressor(quality=level)
+    if encoding == "gzip":
+        return GzipCompressor(level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress(data, encoding, level):
+    compressor = new_compressor(encoding, level)
+    return compressor.process(data) + compressor.finish()
+
+
+def compress_chunks(chunks, encoding, level):
+    """Compress an iterable of byte strings, yielding compressed data as soon as each chunk is in"""
+    compressor = new_compressor(encoding, level)
+    for chunk in chunks:
+        if chunk:
+            yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
@@ -0,0 +1,37 @@
+# Gunicorn configuration shared by scripts/entrypoint.sh and the benchmark suite
+# Command-line flags (e.g. -b in benchmarks/load_test.py) override these values
+
+import gc
+import os
+
+bind = "0.0.0.0:8080"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+timeout = 120
+
+# Import the app once in the master and fork the workers from it, instead of every
+# worker importing it again; the workers share the master's memory until they write to it
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    """Finish loading in the master before the first fork (preload only)"""
+    if not server.cfg.preload_app:
+        return
+    from app import precompile_templates
+
+    precompile_templates(server.app.wsgi())
+
+    # Move everything loaded so far out of the collector's reach: collections in the
+    # workers would otherwise touch (and so copy) every shared object's page
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections rather than the master's"""
+    if not server.cfg.preload_app:
+        return
+    from app import dispose_engines
+
+    dispose_engines(server.app.wsgi())
@@ -0,0 +1,193 @@
+"""
+Lightweight Prometheus metrics for the Flask CRUD application
+
+Counters and histograms live in plain dicts in each process, so recording a
+sample is a dict lookup and a bisect. To aggregate across gunicorn workers,
+each process periodically writes a JSON snapshot of its metrics to a shared
+directory; the worker answering /metrics merges every snapshot and renders
+the Prometheus text exposition format.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Default latency buckets in seconds (5 ms .. 10 s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labels):
+    """Turn a label mapping into a hashable, order-independent key"""
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    """Escape a label value for the exposition format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs, extra=()):
+    """Render label pairs as {a="1",b="2"} for the exposition format"""
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Process-local counters and histograms with optional multi-process aggregation"""
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self._definitions = {}  # name -> (type, help, buckets)
+        self._counters = {}  # name -> {label pairs: value}
+        self._histograms = {}  # name -> {label pairs: [bucket counts..., sum, count]}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self.configure(directory, flush_interval)
+
+    def configure(self, directory=None, flush_interval=1.0):
+        """Set where snapshots are shared (None keeps metrics process-local) and how often they are written"""
+        self.directory = directory
+        self.flush_interval = flush_interval
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # Declaration
+
+    def counter(self, name, help_text):
+        """Declare a counter (name should end in _total)"""
+        self._definitions[name] = ("counter", help_text, None)
+        self._counters.setdefault(name, {})
+        return name
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """Declare a histogram with fixed upper bounds"""
+        self._definitions[name] = ("histogram", help_text, tuple(buckets))
+        self._histograms.setdefault(name, {})
+        return name
+
+    def register_collector(self, callback):
+        """
+        Register a callback returning (counter name, labels, value) samples.
+
+        Used for counters maintained elsewhere (e.g. cache hit counts); the
+        values are copied into the registry before every snapshot.
+        """
+        self._collectors.append(callback)
+        return callback
+
+    # Recording
+
+    def inc(self, name, labels=None, value=1):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        buckets = self._definitions[name][2]
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._histograms[name]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * len(buckets) + [0.0, 0]
+            # Non-cumulative per-bucket counts; made cumulative when rendered
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    # Multi-process snapshots
+
+    def snapshot(self):
+        """Return this process's metrics as a JSON-serializable dict (label pairs become JSON strings)"""
+        for callback in self._collectors:
+            for name, labels, value in callback():
+                with self._lock:
+                    self._counters[name][_labels_key(labels)] = value
+        with self._lock:
+            return {
+                "counters": {
+                    name: {json.dumps(key): value for key, value in series.items()}
+                    for name, series in self._counters.items()
+                },
+                "histograms": {
+                    name: {json.dumps(key): list(state) for key, state in series.items()}
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def maybe_flush(self):
+        """Write a snapshot if ``flush_interval`` seconds passed since the last one"""
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Atomically write this process's snapshot to the shared directory"""
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Merge this process's live metrics with every other worker's latest snapshot"""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            own = f"{os.getpid()}.json"
+            for filename in os.listdir(self.directory):
+                if not filename.endswith(".json") or filename == own:
+                    continue
+                try:
+                    with open(os.path.join(self.directory, filename)) as handle:
+                        snapshots.append(json.load(handle))
+                except (OSError, ValueError):
+                    continue  # worker is mid-write or gone
+
+        merged = {"counters": {}, "histograms": {}}
+        for snapshot in snapshots:
+            for name, series in snapshot.get("counters", {}).items():
+                target = merged["counters"].setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = target.get(key, 0) + value
+            for name, series in snapshot.get("histograms", {}).items():
+                target = merged["histograms"].setdefault(name, {})
+                for key, state in series.items():
+                    if key in target:
+                        target[key] = [a + b for a, b in zip(target[key], state)]
+                    else:
+                        target[key] = list(state)
+        return merged
+
+    # Exposition
+
+    def render(self):
+        """Render all workers' metrics in the Prometheus text format"""
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in self._definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for key, value in sorted(merged["counters"].get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(json.loads(key))} {value}")
+                continue
+
+            for key, state in sorted(merged["histograms"].get(name, {}).items()):
+                pairs = json.loads(key)
+                cumulative = 0
+                for bound, count in zip(buckets, state):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(pairs, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(pairs, [('le', '+Inf')])} {state[-1]}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {state[-2]}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {state[-1]}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,39 @@
+"""
+Script to compact the /api/changes log
+Entries older than CHANGES_RETENTION_DAYS are dropped when the user has a
+newer one, so the log stays proportional to the number of users (plus recent
+writes) rather than the number of writes. Run it daily, e.g. from cron.
+
+Usage:
+    python scripts/compact_changes.py
+    python scripts/compact_changes.py --retention-days 1
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app, change_feed_available, compact_changes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compact the user change log")
+    parser.add_argument("--retention-days", type=int, help="Days kept in full (default: CHANGES_RETENTION_DAYS)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with app.app_context():
+        if not change_feed_available():
+            print("❌ This database has no change log (it needs SQLite)")
+            sys.exit(1)
+        removed = compact_changes(args.retention_days)
+    print(f"✅ Removed {removed} superseded change(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,29 @@
 #!/bin/sh
 set -e
 
-# Initialize database
-python -c "from app import app, db; app.app_context().push(); db.create_all(); print('Database initialized')"
+# Create the schema, or bring an existing database up to date
+flask --app app init-db
 
-# Start gunicorn
-exec gunicorn -b 0.0.0.0:8080 --workers=4 --worker-class=sync --timeout=120 app:app
\ No newline at end of file
+# Share the page cache between gunicorn workers so writes invalidate it everywhere
+export CACHE_BACKEND="${CACHE_BACKEND:-sqlite}"
+
+# Enforce rate limits across all workers (under uvicorn the SQLite calls run in a thread, off the event loop);
+# with sync workers (one request each), keep one free of DB-heavy requests so cheap pages and health checks
+# still answer while the others are busy
+export ADMISSION_BACKEND="${ADMISSION_BACKEND:-sqlite}"
+if [ "${SERVER_MODE:-sync}" = "sync" ] && [ "${GUNICORN_WORKER_CLASS:-sync}" = "sync" ] && [ "${WEB_CONCURRENCY:-4}" -gt 1 ]; then
+    export DB_CONCURRENCY_LIMIT="${DB_CONCURRENCY_LIMIT:-$(( ${WEB_CONCURRENCY:-4} - 1 ))}"
+fi
+
+# Collect metrics from every worker in one place, starting fresh on each boot
+export METRICS_DIR="${METRICS_DIR:-/tmp/flask-metrics}"
+rm -rf "$METRICS_DIR" && mkdir -p "$METRICS_DIR"
+
+# Start the server: gunicorn with sync workers (default), or uvicorn serving asgi.py with SERVER_MODE=async.
+# gunicorn.conf.py preloads the app in the master (GUNICORN_PRELOAD=0 turns that off) and reads
+# WEB_CONCURRENCY, GUNICORN_WORKER_CLASS and GUNICORN_THREADS
+if [ "${SERVER_MODE:-sync}" = "async" ]; then
+    exec uvicorn asgi:application --host 0.0.0.0 --port 8080 \
+        --workers "${WEB_CONCURRENCY:-4}" --limit-concurrency "${ASGI_MAX_CONCURRENCY:-1000}"
+fi
+exec gunicorn -c gunicorn.conf.py app:app
@@ -0,0 +1,63 @@
+"""
+Script to bulk import users into the Flask CRUD application database
+Reads CSV (with a header row) or JSON lines and inserts them in chunks
+
+Usage:
+    python scripts/import_users.py users.csv
+    python scripts/import_users.py users.jsonl --chunk-size 5000
+    cat users.jsonl | python scripts/import_users.py - --format jsonl
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app, decode_lines, import_users, iter_import_rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or JSON lines")
+    parser.add_argument("path", help="File to import, or - for standard input")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Input format (default: from file extension)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows per insert transaction")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+
+    if args.path == "-":
+        stream = sys.stdin.buffer
+    else:
+        stream = open(args.path, "rb")
+
+    # Create application context
+    with app.app_context(), stream:
+        print(f"Importing users from {args.path} ({fmt})...")
+        print("=" * 60)
+
+        started = time.perf_counter()
+        summary = import_users(iter_import_rows(decode_lines(stream), fmt), chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+
+        for error in summary["errors"]:
+            print(f"❌ Line {error['line']}: {error['error']} ({error['email']})")
+        if summary["errors_truncated"]:
+            print("⚠️  More errors were found but not listed")
+
+        print("=" * 60)
+        print(
+            f"Summary: {summary['inserted']} users added, {summary['failed']} rows rejected, "
+            f"{summary['processed']} rows processed in {elapsed:.2f}s"
+        )
+
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Script to rebuild the /stats counter tables from the user table
+The counters are kept current by triggers; run this after restoring a backup,
+editing the database by hand, or whenever /stats looks wrong. Reports the
+groups whose counts had drifted.
+
+Usage:
+    python scripts/rebuild_stats.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app, rebuild_stats, user_stats
+
+
+def drifted(before, after, key):
+    """Return (group, counted, actual) for every group whose count changed"""
+    counted = {row[key]: row["users"] for row in before}
+    actual = {row[key]: row["users"] for row in after}
+    return [
+        (group, counted.get(group, 0), actual.get(group, 0))
+        for group in sorted(counted.keys() | actual.keys(), key=str)
+        if counted.get(group, 0) != actual.get(group, 0)
+    ]
+
+
+def main():
+    with app.app_context():
+        before = rebuild_stats()
+        after = user_stats()
+
+    drift = drifted(before["cities"], after["cities"], "city") + drifted(before["ages"], after["ages"], "from")
+    for group, counted, actual in drift:
+        print(f"   {group}: {counted} -> {actual}")
+    print(f"✅ Rebuilt statistics for {after['total']} users ({len(drift)} group(s) had drifted)")
+
+
+if __name__ == "__main__":
+    main()
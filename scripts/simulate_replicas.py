@@ -0,0 +1,47 @@
+"""
+Script to simulate read replicas locally with copies of the SQLite database
+Copies the primary onto every file in SQLALCHEMY_REPLICA_URIS, once or on an
+interval (the interval acts as replication lag).
+
+Usage:
+    export SQLALCHEMY_REPLICA_URIS=sqlite:////tmp/replica-1.db,sqlite:////tmp/replica-2.db
+    python scripts/simulate_replicas.py
+    python scripts/simulate_replicas.py --interval 2
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app, refresh_replicas, replica_router
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Copy the primary database onto the configured replica files")
+    parser.add_argument("--interval", type=float, help="Keep refreshing every N seconds (simulated lag)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not replica_router.replicas:
+        print("❌ No replicas configured - set SQLALCHEMY_REPLICA_URIS to one or more sqlite:/// file URIs")
+        sys.exit(1)
+
+    with app.app_context():
+        while True:
+            started = time.perf_counter()
+            refresh_replicas()
+            elapsed = time.perf_counter() - started
+            print(f"✅ Refreshed {len(replica_router.replicas)} replica(s) in {elapsed * 1000:.0f} ms")
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,73 +2,284 @@
 """
 OWASP ZAP Hook Script for CI/CD Pipeline
 This script processes ZAP scan results and fails the build based on alert severity thresholds.
+
+Several reports (or glob patterns) can be given; they are parsed in parallel,
+findings are deduplicated by plugin ID and URL, and an optional baseline of
+accepted findings means only new High/Medium findings count against the
+thresholds.
+
+Usage:
+    python scripts/zap-hook.py
+    python scripts/zap-hook.py 'reports/*.xml' --baseline zap-baseline.json --max-medium 0 --json zap-summary.json
 """
 
+import argparse
+import glob
+import os
 import sys
 import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
 import defusedxml.ElementTree as ET
 
+RISK_LEVELS = ("High", "Medium", "Low", "Informational")
+RISK_CODES = {"3": "High", "2": "Medium", "1": "Low", "0": "Informational"}
+
+# <alertitem> children kept for each alert; the long ones (desc, solution, reference...) are dropped
+ALERT_FIELDS = ("pluginid", "alert", "name", "riskcode", "riskdesc", "confidence")
+
+
+def iter_zap_alerts(xml_file):
+    """
+    Yield one dict per <alertitem> in a ZAP XML report.
+
+    The report is read incrementally with iterparse. Each <alertitem> is
+    read when its end tag arrives and then detached from its parent, so
+    memory is bounded by the largest single alert rather than the report.
+    """
+    stack = []  # open elements outside of alert items (report, site, alerts)
+    site = None
+    in_alert = False
+
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        # Events inside an alert item are skipped; its subtree is read in one go at the end
+        if in_alert:
+            if event == "end" and elem.tag == "alertitem":
+                fields = {field: (elem.findtext(field) or "").strip() for field in ALERT_FIELDS}
+                risk = fields["riskdesc"].split(" ", 1)[0] or RISK_CODES.get(fields["riskcode"])
+                yield {
+                    "site": site,
+                    "pluginid": fields["pluginid"],
+                    "name": fields["alert"] or fields["name"],
+                    "risk": risk,
+                    "confidence": fields["confidence"],
+                    "uris": Counter(uri.text.strip() for uri in elem.iter("uri") if uri.text),
+                }
+                stack[-1].remove(elem)
+                in_alert = False
+            continue
+
+        if event == "start":
+            if elem.tag == "alertitem":
+                in_alert = True
+            else:
+                stack.append(elem)
+                if elem.tag == "site":
+                    site = elem.get("name")
+        else:
+            stack.pop()
+            if stack:
+                stack[-1].remove(elem)
+
 
 def parse_zap_xml(xml_file):
-    """Parse ZAP XML report and return alert counts by severity"""
+    """Parse ZAP XML report and return alert counts by severity, plugin and URL, plus unique findings"""
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
+        summary = {"alerts": dict.fromkeys(RISK_LEVELS, 0), "plugins": {}, "urls": {}, "findings": {}}
+
+        for alert in iter_zap_alerts(xml_file):
+            risk = alert["risk"]
+            if risk in summary["alerts"]:
+                summary["alerts"][risk] += 1
 
-        alerts = {"High": 0, "Medium": 0, "Low": 0, "Informational": 0}
+            plugin = summary["plugins"].setdefault(
+                alert["pluginid"], {"name": alert["name"], "risk": risk, "alerts": 0, "instances": 0}
+            )
+            plugin["alerts"] += 1
+            plugin["instances"] += sum(alert["uris"].values())
 
-        # Parse alerts from XML
-        for site in root.findall(".//site"):
-            for alert in site.findall(".//alertitem"):
-                risk = alert.find("riskdesc")
-                if risk is not None:
-                    risk_level = risk.text.split()[0]  # Get 'High', 'Medium', etc.
-                    if risk_level in alerts:
-                        alerts[risk_level] += 1
+            if risk in RISK_LEVELS:
+                for uri, count in alert["uris"].items():
+                    summary["urls"].setdefault(uri, dict.fromkeys(RISK_LEVELS, 0))[risk] += count
 
-        return alerts
+            # One finding per (plugin, URL); alerts without instances are keyed by their site
+            for uri, count in (alert["uris"] or {alert["site"] or "": 0}).items():
+                finding = summary["findings"].setdefault(
+                    (alert["pluginid"], uri),
+                    {"pluginid": alert["pluginid"], "name": alert["name"], "risk": risk, "uri": uri, "count": 0},
+                )
+                finding["count"] += count
+
+        return summary
     except Exception as e:
-        print(f"Error parsing ZAP XML report: {e}")
+        print(f"Error parsing ZAP XML report {xml_file}: {e}")
         return None
 
 
-def main():
-    xml_report = "zap-report.xml"
+def expand_reports(patterns):
+    """Expand glob patterns into a sorted, de-duplicated list of report paths"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def aggregate_reports(paths, jobs=None):
+    """Parse every report (in parallel when there are several) and merge the summaries"""
+    if len(paths) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs or min(len(paths), os.cpu_count() or 1)) as pool:
+            summaries = list(pool.map(parse_zap_xml, paths))
+    else:
+        summaries = [parse_zap_xml(path) for path in paths]
+
+    merged = {"alerts": dict.fromkeys(RISK_LEVELS, 0), "plugins": {}, "urls": {}, "findings": {}}
+    for path, summary in zip(paths, summaries):
+        if summary is None:
+            return None
+        for risk, count in summary["alerts"].items():
+            merged["alerts"][risk] += count
+        for plugin_id, plugin in summary["plugins"].items():
+            target = merged["plugins"].setdefault(plugin_id, dict(plugin, alerts=0, instances=0))
+            target["alerts"] += plugin["alerts"]
+            target["instances"] += plugin["instances"]
+        for uri, counts in summary["urls"].items():
+            target = merged["urls"].setdefault(uri, dict.fromkeys(RISK_LEVELS, 0))
+            for risk, count in counts.items():
+                target[risk] += count
+        for key, finding in summary["findings"].items():
+            target = merged["findings"].setdefault(key, dict(finding, count=0))
+            target["count"] += finding["count"]
+    return merged
+
+
+def load_baseline(path):
+    """Return the set of (plugin ID, URL) findings accepted in a baseline or earlier JSON summary"""
+    if not os.path.exists(path):
+        print(f"⚠️  Baseline {path} not found - every finding counts as new")
+        return set()
+    with open(path) as handle:
+        baseline = json.load(handle)
+    return {(finding["pluginid"], finding["uri"]) for finding in baseline.get("findings", [])}
+
+
+def sorted_findings(findings):
+    """Order findings by severity, then plugin and URL"""
+    order = {risk: index for index, risk in enumerate(RISK_LEVELS)}
+    return sorted(findings, key=lambda f: (order.get(f["risk"], len(order)), f["pluginid"] or "", f["uri"]))
+
+
+def print_top_findings(summary, limit=10):
+    """Print the plugins and URLs with the most findings"""
+    plugins = sorted(summary["plugins"].items(), key=lambda item: item[1]["instances"], reverse=True)
+    if plugins:
+        print(f"\n🔌 Top Plugins:")
+        for plugin_id, plugin in plugins[:limit]:
+            print(f"   [{plugin['risk']}] {plugin_id} {plugin['name']}: {plugin['instances']} instance(s)")
+
+    urls = sorted(summary["urls"].items(), key=lambda item: (item[1]["High"], item[1]["Medium"]), reverse=True)
+    if urls:
+        print(f"\n🌐 Top URLs ({len(urls)} affected):")
+        for uri, counts in urls[:limit]:
+            print(f"   {uri}: High {counts['High']}, Medium {counts['Medium']}, Low {counts['Low']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate OWASP ZAP XML reports against severity thresholds")
+    parser.add_argument("reports", nargs="*", default=["zap-report.xml"], help="Report paths or glob patterns")
+    parser.add_argument("--baseline", help="JSON file of accepted findings; only findings not in it count")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the current findings to --baseline")
+    parser.add_argument("--max-high", type=int, default=0, help="New High findings allowed before failing")
+    parser.add_argument(
+        "--max-medium", type=int, default=None, help="New Medium findings allowed before failing (default: warn only)"
+    )
+    parser.add_argument("--json", dest="json_path", help="Write a machine-readable summary to this file")
+    parser.add_argument("--jobs", type=int, help="Parser processes (default: one per report, up to the CPU count)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
     print("\n" + "=" * 60)
     print("OWASP ZAP Scan Results")
     print("=" * 60)
 
-    alerts = parse_zap_xml(xml_report)
+    reports = expand_reports(args.reports)
+    if not reports:
+        print(f"❌ No ZAP reports match {' '.join(args.reports)}")
+        sys.exit(1)
+
+    summary = aggregate_reports(reports, args.jobs)
 
-    if alerts is None:
+    if summary is None:
         print("❌ Failed to parse ZAP report")
         sys.exit(1)
+    alerts = summary["alerts"]
+    findings = sorted_findings(summary["findings"].values())
+
+    # Only findings missing from the baseline count against the thresholds
+    baseline = load_baseline(args.baseline) if args.baseline and not args.update_baseline else set()
+    new_findings = [finding for finding in findings if (finding["pluginid"], finding["uri"]) not in baseline]
+    new_counts = Counter(finding["risk"] for finding in new_findings)
 
     # Print summary
+    print(f"\n📄 Reports: {len(reports)}")
     print(f"\n📊 Alert Summary:")
     print(f"   High:          {alerts['High']}")
     print(f"   Medium:        {alerts['Medium']}")
     print(f"   Low:           {alerts['Low']}")
     print(f"   Informational: {alerts['Informational']}")
+    print(f"\n🆕 New findings (unique plugin/URL pairs{' not in the baseline' if baseline else ''}):")
+    print(f"   High:          {new_counts['High']}")
+    print(f"   Medium:        {new_counts['Medium']}")
+    print_top_findings(summary)
     print("\n" + "=" * 60)
 
+    failures = []
+    if new_counts["High"] > args.max_high:
+        failures.append(f"{new_counts['High']} new High findings (allowed: {args.max_high})")
+    if args.max_medium is not None and new_counts["Medium"] > args.max_medium:
+        failures.append(f"{new_counts['Medium']} new Medium findings (allowed: {args.max_medium})")
+
+    if args.json_path:
+        with open(args.json_path, "w") as handle:
+            json.dump(
+                {
+                    "reports": reports,
+                    "alerts": alerts,
+                    "new": {risk: new_counts[risk] for risk in RISK_LEVELS},
+                    "thresholds": {"High": args.max_high, "Medium": args.max_medium},
+                    "passed": not failures,
+                    "failures": failures,
+                    "plugins": summary["plugins"],
+                    "new_findings": new_findings,
+                    "findings": findings,
+                },
+                handle,
+                indent=2,
+            )
+        print(f"\n📝 JSON summary written to {args.json_path}")
+
+    if args.update_baseline:
+        if not args.baseline:
+            print("❌ --update-baseline needs --baseline PATH")
+            sys.exit(1)
+        with open(args.baseline, "w") as handle:
+            json.dump({"findings": findings}, handle, indent=2)
+        print(f"\n📌 Baseline updated with {len(findings)} findings: {args.baseline}")
+        sys.exit(0)
+
     # Determine if build should fail
-    # Threshold: Fail only on High severity alerts (Medium alerts will be warnings)
-    if alerts["High"] > 0:
+    if failures:
         print(f"\n❌ DAST SCAN FAILED!")
-        print(f"   Found {alerts['High']} High severity alerts")
+        for failure in failures:
+            print(f"   Found {failure}")
         print(f"   Security threshold exceeded - failing build")
         sys.exit(1)
-    elif alerts["Medium"] > 0:
+    elif new_counts["Medium"] > 0:
         print(f"\n⚠️  DAST SCAN PASSED WITH WARNINGS!")
-        print(f"   Found {alerts['Medium']} Medium severity alerts")
+        print(f"   Found {new_counts['Medium']} new Medium severity findings")
         print(f"   These should be reviewed and fixed in future iterations")
-        print(f"   Build will continue (only HIGH alerts block deployment)")
+        if args.max_medium is None:
+            print(f"   Build will continue (only HIGH alerts block deployment)")
+        else:
+            print(f"   Build will continue (within the threshold of {args.max_medium})")
         sys.exit(0)
     else:
         print(f"\n✅ DAST SCAN PASSED!")
-        print(f"   No High or Medium severity alerts found")
+        print(f"   No new High or Medium severity findings")
         sys.exit(0)
 
 
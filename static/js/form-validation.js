@@ -0,0 +1,89 @@
+// Client-side validation for the add and update user forms
+document.addEventListener('DOMContentLoaded', function() {
+    // Form validation
+    const form = document.querySelector('form');
+    if (form) {
+        const inputs = form.querySelectorAll('input[required]');
+        
+        // Real-time validation
+        inputs.forEach(function(input) {
+            input.addEventListener('blur', function() {
+                validateField(this);
+            });
+            
+            input.addEventListener('input', function() {
+                if (this.classList.contains('is-invalid')) {
+                    validateField(this);
+                }
+            });
+        });
+        
+        // Form submission validation
+        form.addEventListener('submit', function(e) {
+            let isValid = true;
+            
+            inputs.forEach(function(input) {
+                if (!validateField(input)) {
+                    isValid = false;
+                }
+            });
+            
+            if (!isValid) {
+                e.preventDefault();
+                alert('Please fix the errors before submitting.');
+            }
+        });
+        
+        function validateEmailField(value) {
+            const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+            return emailRegex.test(value) ? { isValid: true, message: '' } : { isValid: false, message: 'Please enter a valid email address.' };
+        }
+        
+        function validateAgeField(value) {
+            const age = parseInt(value);
+            return (isNaN(age) || age < 1 || age > 120) ? { isValid: false, message: 'Age must be between 1 and 120.' } : { isValid: true, message: '' };
+        }
+        
+        function validateNameField(value) {
+            return (value.length < 2 || value.length > 50) ? { isValid: false, message: 'Name must be between 2 and 50 characters.' } : { isValid: true, message: '' };
+        }
+        
+        function validateCityField(value) {
+            return (value.length < 2 || value.length > 50) ? { isValid: false, message: 'City must be between 2 and 50 characters.' } : { isValid: true, message: '' };
+        }
+        
+        function getValidationResult(field, value) {
+            if (!value) return { isValid: false, message: 'This field is required.' };
+            if (field.type === 'email') return validateEmailField(value);
+            if (field.name === 'age') return validateAgeField(value);
+            if (field.name === 'first_name' || field.name === 'last_name') return validateNameField(value);
+            if (field.name === 'city') return validateCityField(value);
+            return { isValid: true, message: '' };
+        }
+        
+        function updateFieldFeedback(field, isValid, errorMessage) {
+            if (isValid) {
+                field.classList.remove('is-invalid');
+                field.classList.add('is-valid');
+            } else {
+                field.classList.remove('is-valid');
+                field.classList.add('is-invalid');
+            }
+            
+            let feedback = field.parentNode.querySelector('.invalid-feedback');
+            if (!feedback) {
+                feedback = document.createElement('div');
+                feedback.className = 'invalid-feedback';
+                field.parentNode.appendChild(feedback);
+            }
+            feedback.textContent = errorMessage;
+        }
+        
+        function validateField(field) {
+            const value = field.value.trim();
+            const { isValid, message } = getValidationResult(field, value);
+            updateFieldFeedback(field, isValid, message);
+            return isValid;
+        }
+    }
+});
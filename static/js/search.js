@@ -0,0 +1,75 @@
+// Search page: focus, suggestions while typing and a clear button
+document.addEventListener('DOMContentLoaded', function() {
+    // Focus on search input
+    const searchInput = document.querySelector('input[name="query"]');
+    if (searchInput) {
+        searchInput.focus();
+    }
+    
+    // Suggest names and cities while typing, at most one request per pause in typing
+    const suggestInput = document.getElementById('search-query');
+    const suggestions = document.getElementById('search-suggestions');
+    const suggestCache = new Map();
+    let suggestTimer = null;
+
+    function showSuggestions(items) {
+        suggestions.replaceChildren(...items.map(function(item) {
+            const option = document.createElement('option');
+            option.value = item.value;
+            option.label = item.field.replace('_', ' ') + ' (' + item.users + ')';
+            return option;
+        }));
+    }
+
+    if (suggestInput && suggestions) {
+        suggestInput.addEventListener('input', function() {
+            clearTimeout(suggestTimer);
+            const prefix = suggestInput.value.trim().toLowerCase();
+            if (!prefix) {
+                showSuggestions([]);
+                return;
+            }
+            if (suggestCache.has(prefix)) {
+                showSuggestions(suggestCache.get(prefix));
+                return;
+            }
+            suggestTimer = setTimeout(function() {
+                fetch(suggestInput.dataset.suggestUrl + '?q=' + encodeURIComponent(prefix))
+                    .then(function(response) { return response.ok ? response.json() : { suggestions: [] }; })
+                    .then(function(data) {
+                        suggestCache.set(prefix, data.suggestions);
+                        if (suggestInput.value.trim().toLowerCase() === prefix) {
+                            showSuggestions(data.suggestions);
+                        }
+                    })
+                    .catch(function() {});
+            }, 150);
+        });
+    }
+
+    // Clear search functionality
+    const clearButton = document.createElement('button');
+    clearButton.type = 'button';
+    clearButton.className = 'btn btn-outline-secondary';
+    clearButton.innerHTML = '<i class="fas fa-times"></i>';
+    clearButton.title = 'Clear search';
+    
+    clearButton.addEventListener('click', function() {
+        searchInput.value = '';
+        searchInput.focus();
+    });
+    
+    // Add clear button to search form
+    const searchForm = document.querySelector('form');
+    if (searchForm && searchInput.value) {
+        const inputGroup = searchInput.parentNode;
+        inputGroup.classList.add('input-group');
+        searchInput.classList.remove('form-control-lg');
+        searchInput.classList.add('form-control');
+        
+        const clearDiv = document.createElement('div');
+        clearDiv.className = 'input-group-append';
+        clearDiv.appendChild(clearButton);
+        inputGroup.appendChild(clearDiv);
+    }
+});